@@ -1,15 +1,20 @@
 import logging
 
-from flask import Flask
+from flask import Flask, Response, g, request
 from flask_admin import Admin
 from flask_basicauth import BasicAuth
 
-from configuration import DB_URL, ADMIN_PANEL_SECRET_KEY, ADMIN_PANEL_BASIC_AUTH_PASSWORD, ADMIN_PANEL_BASIC_AUTH_USERNAME
+from configuration import (DB_URL, ADMIN_PANEL_SECRET_KEY, ADMIN_PANEL_BASIC_AUTH_PASSWORD, ADMIN_PANEL_BASIC_AUTH_USERNAME,
+                           DB_PROFILING)
 
 from database.models.user import User, UserView
 from database.models.faq import FAQCategory, FAQCategoryView
 from database.models.events import Event, EventView, EventRegistration, EventRegistrationView
-from database.base import current_session
+from database.models.broadcast import Broadcast, BroadcastView
+from database.models.media import MediaFile, MediaFileView
+from database.base import current_session, engine
+from database.profiling import start_scope, report_scope
+from services.metrics import instrument_engine, render_metrics, current_stats
 
 
 app = Flask(__name__)
@@ -29,6 +34,38 @@ admin.add_view(UserView(User, current_session))
 admin.add_view(FAQCategoryView(FAQCategory, current_session))
 admin.add_view(EventView(Event, current_session))
 admin.add_view(EventRegistrationView(EventRegistration, current_session))
+admin.add_view(BroadcastView(Broadcast, current_session))
+admin.add_view(MediaFileView(MediaFile, current_session))
+
+instrument_engine(engine)
+
+
+if DB_PROFILING:
+    @app.before_request
+    def start_query_scope():
+        g.query_stats, g.query_stats_token = start_scope()
+
+    @app.after_request
+    def end_query_scope(response):
+        # Raises in the strict mode when the request went over the query budget, the
+        # stats are popped so the error response of that raise is not reported again
+        stats = g.pop('query_stats', None)
+        if stats is not None:
+            report_scope(f'{request.method} {request.path}', stats)
+        return response
+
+    @app.teardown_request
+    def reset_query_scope(exception):
+        # Runs also when the view or the report raised
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            current_stats.reset(token)
+
+
+@app.route('/metrics')
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
 if __name__ == '__main__':
     from gevent.pywsgi import WSGIServer
@@ -0,0 +1,6 @@
+from celery import Celery
+
+from configuration import CELERY_BROKER_URL
+
+app = Celery('background_tasks', broker=CELERY_BROKER_URL, include=['background_tasks.broadcast'])
+app.conf.worker_prefetch_multiplier = 1
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+import aioredis
+
+from aiogram import Bot
+from celery.signals import worker_ready
+from sqlalchemy import select
+
+from background_tasks import app
+from services.broadcast import run_broadcast
+from bot.middlewares.outbound_rate_limit import OutboundRateLimitMiddleware
+from database.base import session, async_engine
+from database.models.broadcast import Broadcast, BroadcastStatus
+
+from configuration import BOT_TOKEN, USE_REDIS, REDIS_URL, BROADCAST_LEASE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+async def _send_broadcast(broadcast_id: int) -> bool:
+    bot = Bot(BOT_TOKEN)
+    redis = aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+    # Broadcasts take their part of the limit shared with the bot processes
+    bot.session.middleware(OutboundRateLimitMiddleware(redis))
+    try:
+        return await run_broadcast(bot, broadcast_id)
+    finally:
+        await bot.session.close()
+        await redis.close()
+        # asyncpg connections are bound to the event loop of this task
+        await async_engine.dispose()
+
+
+@app.task(bind=True, max_retries=None)
+def send_broadcast(self, broadcast_id: int) -> None:
+    if not USE_REDIS:
+        logger.error('Broadcast %s is not sent: broadcasts need Redis to share the outbound rate limit',
+                     broadcast_id)
+        return
+    if not asyncio.run(_send_broadcast(broadcast_id)):
+        # Another worker holds the lease, take over if it stops renewing it
+        raise self.retry(countdown=BROADCAST_LEASE_TIMEOUT)
+
+
+@worker_ready.connect
+def resume_broadcasts(**kwargs) -> None:
+    """
+        Restart broadcasts interrupted by a worker restart from their last checkpoint.
+        Broadcasts still sent by a live worker are left to it by their lease.
+    """
+    with session() as s:
+        broadcast_ids = s.scalars(select(Broadcast.id).where(Broadcast.status == BroadcastStatus.running)).all()
+    for broadcast_id in broadcast_ids:
+        send_broadcast.delay(broadcast_id)
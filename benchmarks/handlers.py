@@ -0,0 +1,247 @@
+"""
+Throughput of the hot update flows through the real dispatcher.
+
+Builds the Dispatcher of main.py with main_router and its middlewares,
+feeds it synthetic updates of many concurrent users and reports updates/s
+and p50/p99 latency of every flow:
+
+    python -m benchmarks.handlers --users 200 --concurrency 50 --output benchmark.json
+
+Flows: /start, FAQ navigation, the event list, the full event registration
+and chat join requests of the registered users (every second one approved).
+Bot API calls are answered by RecordingSession instead of Telegram, and the
+outbound rate limiter is left out, so the numbers are the bot's own cost.
+A flow ends when the join requests it queued are answered, so the join
+requests flow includes the background answers.
+
+Needs a throwaway PostgreSQL database in DB_URL with all migrations applied,
+the models use PostgreSQL-only statements. The generated users, FAQ
+categories, event and its registrations are deleted afterwards.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import platform
+import time
+
+from typing import Any, Callable, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from sqlalchemy import event as sa_event, delete, update
+
+from main import create_dispatcher, create_storage
+from benchmarks.session import RecordingSession
+from bot.utils.callbacks import FAQCallback
+from bot.utils.strings import strings
+from database.base import async_session, async_engine
+from database.connector import DbConnector
+from database.models.user import User
+from database.models.faq import FAQCategory
+from database.models.events import Event, EventRegistration
+from services.cache_invalidation import InvalidationListener, FAQ_TOPIC, EVENTS_TOPIC, REGISTRATIONS_TOPIC
+from services.join_requests import JoinRequestWorker
+from services.media_cache import media_source_hash
+
+FIRST_USER_ID = 2 * 10 ** 12
+FIRST_CHAT_ID = -2 * 10 ** 12
+EVENT_PHOTO = 'https://example.com/benchmark-event.png'
+BOT_TOKEN = '42:BENCHMARK'
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {'id': user_id, 'is_bot': False, 'first_name': 'Benchmark', 'language_code': 'uk'}
+
+
+def message_update(user_id: int, text: str) -> Dict[str, Any]:
+    return {'update_id': next(_update_ids), 'message': {
+        'message_id': next(_update_ids), 'date': int(time.time()), 'text': text,
+        'chat': {'id': user_id, 'type': 'private'}, 'from': _user(user_id)
+    }}
+
+
+def callback_update(user_id: int, data: str) -> Dict[str, Any]:
+    return {'update_id': next(_update_ids), 'callback_query': {
+        'id': str(next(_update_ids)), 'chat_instance': str(user_id), 'data': data, 'from': _user(user_id),
+        'message': {'message_id': next(_update_ids), 'date': int(time.time()), 'text': '...',
+                    'chat': {'id': user_id, 'type': 'private'}}
+    }}
+
+
+def join_request_update(user_id: int, chat_id: int) -> Dict[str, Any]:
+    return {'update_id': next(_update_ids), 'chat_join_request': {
+        'chat': {'id': chat_id, 'type': 'supergroup', 'title': 'Benchmark'}, 'from': _user(user_id),
+        'user_chat_id': user_id, 'date': int(time.time())
+    }}
+
+
+class Fixtures:
+    """Rows the flows work on, created in the database before the run."""
+
+    def __init__(self, users: int):
+        self.user_ids = range(FIRST_USER_ID, FIRST_USER_ID + users)
+        self.event_id = 0
+        self.faq_root_id = 0
+        self.faq_leaf_ids: List[int] = []
+
+    async def create(self) -> None:
+        async with async_session() as s:
+            event = Event(title='Benchmark event', description='Benchmark', photo=EVENT_PHOTO,
+                          is_registration_enabled=True,
+                          first_division_invite_link='https://t.me/+benchmark1', first_division_chat_id=FIRST_CHAT_ID,
+                          second_division_invite_link='https://t.me/+benchmark2',
+                          second_division_chat_id=FIRST_CHAT_ID - 1)
+            root = FAQCategory(title='Benchmark')
+            s.add_all([event, root])
+            await s.flush()
+            leaves = [FAQCategory(title=f'Benchmark {i}', parent_id=root.id, leaf_category=True,
+                                  category_answer=f'Answer {i}') for i in range(3)]
+            s.add_all(leaves)
+            await s.flush()
+            self.event_id, self.faq_root_id, self.faq_leaf_ids = event.id, root.id, [leaf.id for leaf in leaves]
+        for topic in (FAQ_TOPIC, EVENTS_TOPIC):
+            await InvalidationListener().publish(topic)
+
+    async def approve_half(self) -> None:
+        async with async_session() as s:
+            await s.execute(
+                update(EventRegistration)
+                .where(EventRegistration.event_id == self.event_id, EventRegistration.user_id % 2 == 0)
+                .values(is_approved=True)
+            )
+        await InvalidationListener().publish(REGISTRATIONS_TOPIC)
+
+    async def delete(self) -> None:
+        async with async_session() as s:
+            await s.execute(delete(EventRegistration).where(EventRegistration.event_id == self.event_id))
+            await s.execute(delete(Event).where(Event.id == self.event_id))
+            await s.execute(delete(FAQCategory).where(FAQCategory.id.in_(self.faq_leaf_ids)))
+            await s.execute(delete(FAQCategory).where(FAQCategory.id == self.faq_root_id))
+            await s.execute(delete(User).where(User.telegram_id.in_(self.user_ids)))
+        await DbConnector().delete_media_file_id(media_source_hash(EVENT_PHOTO))
+
+    def flows(self) -> Dict[str, Callable[[int], List[Dict[str, Any]]]]:
+        """Updates sent one after another by a user in every flow."""
+        return {
+            'start': lambda user_id: [message_update(user_id, '/start')],
+            'faq': lambda user_id: [
+                message_update(user_id, strings.get('buttons', 'faq')),
+                callback_update(user_id, FAQCallback.from_ids([self.faq_root_id]).pack()),
+                callback_update(user_id, FAQCallback.from_ids([self.faq_root_id, self.faq_leaf_ids[0]]).pack()),
+                callback_update(user_id, FAQCallback().pack()),
+            ],
+            'event_list': lambda user_id: [
+                message_update(user_id, strings.get('buttons', 'events')),
+                callback_update(user_id, f'event_select_{self.event_id}'),
+                callback_update(user_id, 'event_registration_back'),
+            ],
+            'registration': lambda user_id: [
+                callback_update(user_id, f'event_register_{self.event_id}'),
+                callback_update(user_id, 'yes'),
+                message_update(user_id, f'benchmark{user_id}'),
+                callback_update(user_id, 'first' if user_id % 2 else 'second'),
+                callback_update(user_id, 'yes'),
+                callback_update(user_id, 'yes'),
+            ],
+            'join_requests': lambda user_id: [
+                join_request_update(user_id, FIRST_CHAT_ID if user_id % 2 else FIRST_CHAT_ID - 1),
+            ],
+        }
+
+
+def percentile(latencies: List[float], q: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_flow(dp: Dispatcher, bot: Bot, steps: Callable[[int], List[Dict[str, Any]]],
+                   user_ids: range, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    queries = 0
+    api_calls_before = sum(bot.session.calls.values())
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def count_query(*args: Any) -> None:
+        nonlocal queries
+        queries += 1
+
+    async def run_user(user_id: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            for raw_update in steps(user_id):
+                update_ = Update.model_validate(raw_update, context={'bot': bot})
+                started_at = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update_)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started_at)
+
+    sa_event.listen(async_engine.sync_engine, 'before_cursor_execute', count_query)
+    started_at = time.perf_counter()
+    try:
+        await asyncio.gather(*[run_user(user_id) for user_id in user_ids])
+        await JoinRequestWorker().drain()
+    finally:
+        elapsed = time.perf_counter() - started_at
+        sa_event.remove(async_engine.sync_engine, 'before_cursor_execute', count_query)
+    return {
+        'updates': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'updates_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'db_queries_per_update': round(queries / len(latencies), 2),
+        'api_calls_per_update': round((sum(bot.session.calls.values()) - api_calls_before) / len(latencies), 2),
+    }
+
+
+async def run(users: int, concurrency: int) -> Dict[str, Any]:
+    dp = create_dispatcher(create_storage())
+    bot = Bot(BOT_TOKEN, session=RecordingSession())
+    fixtures = Fixtures(users)
+    results: Dict[str, Any] = {}
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        await fixtures.create()
+        for name, steps in fixtures.flows().items():
+            if name == 'join_requests':
+                await fixtures.approve_half()
+            results[name] = await run_flow(dp, bot, steps, fixtures.user_ids, concurrency)
+            print(f'{name:>14}: {results[name]["updates_per_second"]:>8} updates/s, '
+                  f'p50 {results[name]["p50_ms"]} ms, p99 {results[name]["p99_ms"]} ms, '
+                  f'{results[name]["db_queries_per_update"]} queries/update, {results[name]["errors"]} errors')
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await fixtures.delete()
+        await async_engine.dispose()
+    return {
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'users': users,
+        'concurrency': concurrency,
+        'flows': results,
+        'api_calls': dict(bot.session.calls),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--output', default='benchmark.json', help='JSON file the results are written to')
+    args = parser.parse_args()
+    report = asyncio.run(run(args.users, args.concurrency))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
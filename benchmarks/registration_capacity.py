@@ -0,0 +1,85 @@
+"""
+Load test of event capacity enforcement.
+
+Submits hundreds of concurrent registrations to a throwaway event with a
+limited number of places and checks that no place is given away twice:
+
+    python -m benchmarks.registration_capacity --submits 500 --capacity 120 --division-capacity 70
+
+Needs the database from DB_URL with all migrations applied. The event,
+its registrations and the generated users are deleted afterwards.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from collections import Counter
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from database.base import async_session, async_engine
+from database.models.user import User
+from database.models.events import Event, EventRegistration
+from services.event_capacity import EventCapacity
+
+FIRST_USER_ID = 10 ** 12
+
+
+async def run(submits: int, capacity: int, division_capacity: int) -> bool:
+    user_ids = range(FIRST_USER_ID, FIRST_USER_ID + submits)
+    async with async_session() as s:
+        await s.execute(insert(User).values([{'telegram_id': user_id} for user_id in user_ids])
+                        .on_conflict_do_nothing())
+        event = Event(title='Capacity load test', description='', is_registration_enabled=True,
+                      max_capacity=capacity, first_division_capacity=division_capacity)
+        s.add(event)
+    try:
+        started_at = time.monotonic()
+        results = await asyncio.gather(*[
+            EventCapacity().register(event.id, user_id, 1 if user_id % 2 else 2,
+                                     is_ami_student=True, codingame_username=str(user_id))
+            for user_id in user_ids
+        ])
+        elapsed = time.monotonic() - started_at
+
+        async with async_session() as s:
+            taken = dict((await s.execute(
+                select(EventRegistration.division, func.count())
+                .where(EventRegistration.event_id == event.id)
+                .group_by(EventRegistration.division)
+            )).all())
+            counters = await s.get(Event, event.id)
+        accepted = sum(result.refusal is None for result in results)
+        refusals = Counter(result.refusal.value for result in results if result.refusal is not None)
+        print(f'{submits} submits in {elapsed:.2f} s, {accepted} accepted, refused: {dict(refusals)}, '
+              f'registrations per division: {taken}, counter: {counters.registrations_count}')
+        return (
+            accepted == sum(taken.values()) == counters.registrations_count
+            and counters.registrations_count <= capacity
+            and taken.get(1, 0) == counters.first_division_count <= division_capacity
+            and taken.get(2, 0) == counters.second_division_count
+        )
+    finally:
+        async with async_session() as s:
+            await s.execute(delete(EventRegistration).where(EventRegistration.event_id == event.id))
+            await s.execute(delete(Event).where(Event.id == event.id))
+            await s.execute(delete(User).where(User.telegram_id.in_(user_ids)))
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submits', type=int, default=500)
+    parser.add_argument('--capacity', type=int, default=120)
+    parser.add_argument('--division-capacity', type=int, default=70)
+    args = parser.parse_args()
+    if not asyncio.run(run(args.submits, args.capacity, args.division_capacity)):
+        print('Places were overbooked')
+        sys.exit(1)
+    print('No overbooking')
+
+
+if __name__ == '__main__':
+    main()
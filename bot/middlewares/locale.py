@@ -0,0 +1,25 @@
+from typing import Callable, Dict, Awaitable, Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.utils.strings import strings, current_locale
+
+
+class LocaleMiddleware(BaseMiddleware):
+    """Selects the string catalog of the user's Telegram language for the whole update."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        locale = strings.resolve_locale(user.language_code if user else None)
+        data['locale'] = locale
+        token = current_locale.set(locale)
+        try:
+            return await handler(event, data)
+        finally:
+            current_locale.reset(token)
@@ -0,0 +1,87 @@
+import time
+
+from functools import lru_cache
+from typing import Callable, Dict, Awaitable, Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from services.metrics import (UpdateStats, current_stats, HANDLER_LATENCY, HANDLER_DB_QUERIES, HANDLER_DB_TIME,
+                              BOT_API_LATENCY)
+
+
+@lru_cache(maxsize=None)
+def handler_label(callback: Callable) -> str:
+    """Routers reuse handler names, the module and the line tell the handlers apart."""
+    code = getattr(callback, '__code__', None)
+    name = f'{callback.__module__}.{getattr(callback, "__qualname__", type(callback).__name__)}'
+    return f'{name}:{code.co_firstlineno}' if code is not None else name
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+        Outer middleware measuring the whole processing of an event: latency,
+        database queries and their time, labeled with the handler that took it.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # The query profiler of the update may have started collecting already
+        stats = current_stats.get()
+        token = None
+        if stats is None:
+            stats = UpdateStats()
+            token = current_stats.set(stats)
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            if token is not None:
+                current_stats.reset(token)
+            labels = (type(event).__name__, stats.handler)
+            HANDLER_LATENCY.labels(*labels).observe(elapsed)
+            HANDLER_DB_QUERIES.labels(*labels).observe(stats.queries)
+            HANDLER_DB_TIME.labels(*labels).observe(stats.query_time)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+        Inner middleware passing the name of the matched handler to MetricsMiddleware
+        and the query profiler through UpdateStats, the handler is not known yet
+        in outer middlewares.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        stats = current_stats.get()
+        if stats is not None:
+            stats.handler = handler_label(data['handler'].callback)
+        return await handler(event, data)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Measures the latency of Bot API calls, after they passed the rate limiter."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        started_at = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            BOT_API_LATENCY.labels(method.__api_method__).observe(time.perf_counter() - started_at)
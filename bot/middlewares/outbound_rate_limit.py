@@ -0,0 +1,94 @@
+import logging
+
+from collections import OrderedDict
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aioredis import Redis
+
+from services.rate_limiter import TokenBucket, SharedTokenBucket
+from services.metrics import OUTBOUND_QUEUE_DEPTH
+
+from configuration import (OUTBOUND_RATE, OUTBOUND_PRIVATE_CHAT_RATE, OUTBOUND_GROUP_CHAT_RATE,
+                           OUTBOUND_MAX_ATTEMPTS, BOT_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+CHAT_BUCKETS_SIZE = 10000
+PRIVATE_CHAT_BURST = 3
+# Per-chat limits of Telegram apply to posting messages, not to e.g. approving join requests
+CHAT_LIMITED_METHODS = ('send', 'forward', 'copy')
+OUTBOUND_RATE_KEY = 'outbound_rate'
+
+
+class OutboundRateLimitMiddleware(BaseRequestMiddleware):
+    """
+        Keeps Bot API calls addressed to a chat within the global Telegram limit,
+        and calls posting messages within the per-chat limits as well. Calls over
+        the limit wait in line instead of failing, and calls answered with
+        retry_after are repeated after the pause.
+        Calls without a chat (getUpdates, answerCallbackQuery, ...) are not limited.
+
+        With Redis the global limit is shared by every process of the bot,
+        broadcast workers included. Without it every bot worker gets an equal
+        part of the limit, and broadcasts are not available.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None):
+        if redis is not None:
+            self.bucket = SharedTokenBucket(redis, OUTBOUND_RATE_KEY, OUTBOUND_RATE)
+        else:
+            self.bucket = TokenBucket(OUTBOUND_RATE / BOT_WORKERS)
+        self._chat_buckets: 'OrderedDict[Union[int, str], TokenBucket]' = OrderedDict()
+        self.queue_depth = 0
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is not None:
+            self._chat_buckets.move_to_end(chat_id)
+            return bucket
+        if isinstance(chat_id, int) and chat_id > 0:
+            bucket = TokenBucket(OUTBOUND_PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST)
+        else:
+            bucket = TokenBucket(OUTBOUND_GROUP_CHAT_RATE, 1)
+        self._chat_buckets[chat_id] = bucket
+        if len(self._chat_buckets) > CHAT_BUCKETS_SIZE:
+            idle_chat_id = next(iter(self._chat_buckets))
+            if not self._chat_buckets[idle_chat_id].waiting:
+                del self._chat_buckets[idle_chat_id]
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        chat_bucket = self._chat_bucket(chat_id) if method.__api_method__.startswith(CHAT_LIMITED_METHODS) else None
+        for attempt in range(1, OUTBOUND_MAX_ATTEMPTS + 1):
+            self.queue_depth += 1
+            OUTBOUND_QUEUE_DEPTH.inc()
+            try:
+                # The chat limit goes first, so calls to a busy chat do not hold up the global line
+                if chat_bucket is not None:
+                    await chat_bucket.acquire()
+                await self.bucket.acquire()
+            finally:
+                self.queue_depth -= 1
+                OUTBOUND_QUEUE_DEPTH.dec()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == OUTBOUND_MAX_ATTEMPTS:
+                    raise
+                logger.warning('Flood control on %s to %s, retrying in %s s (%s calls queued)',
+                               method.__api_method__, chat_id, e.retry_after, self.queue_depth)
+                (chat_bucket or self.bucket).pause(e.retry_after)
@@ -0,0 +1,19 @@
+from typing import Callable, Dict, Awaitable, Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from database.profiling import query_scope
+
+
+class QueryProfilerMiddleware(BaseMiddleware):
+    """Groups the statements of an update for the DB_PROFILING mode."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        with query_scope(f'update {event.update_id} ({event.event_type})'):
+            return await handler(event, data)
@@ -3,7 +3,7 @@ from typing import Callable, Dict, Awaitable, Any
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from database.connector import DbConnector
+from services.user_cache import UserCache
 
 
 class UserToContextMiddleware(BaseMiddleware):
@@ -14,9 +14,8 @@ class UserToContextMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
 
-        db_con = DbConnector()
         user = data['event_from_user']
-        data['user'] = db_con.get_or_create_user(user.id, user.username)
+        data['user'] = await UserCache().get(user.id, user.username)
         process = False
         if event.chat.type == 'private':
             process = True
@@ -36,7 +35,5 @@ class UpdateUsernameMiddleware(BaseMiddleware):
         user = data['user']
         from_user = data['event_from_user']
         if user.username != from_user.username:
-            user.username = from_user.username
-            db_con = DbConnector()
-            db_con.update_user(user)
+            UserCache().update_username(user, from_user.username)
         return await handler(event, data)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+
+from aiogram import Router
+
+from aiogram.types import Message, CallbackQuery
+from aiogram.enums.parse_mode import ParseMode
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+
+from database.models.broadcast import Broadcast
+from database.base import async_session
+
+from bot.filters.role_filter import AdminFilter
+from bot.utils.keyboards import MainKeyboards
+
+from bot.states.broadcast import BroadcastForm
+
+from background_tasks.broadcast import send_broadcast
+
+from bot.utils.strings import strings
+
+from configuration import USE_REDIS
+
+admin_broadcast_router = Router()
+
+
+@admin_broadcast_router.message(Command(commands=['broadcast']), AdminFilter())
+async def broadcast_handler(message: Message, command: CommandObject, state: FSMContext) -> None:
+    """
+        /broadcast - message all users
+        /broadcast <event_id> - message everyone registered on the event
+    """
+    await state.clear()
+    if not USE_REDIS:
+        # Broadcast workers share the outbound rate limit with the bot only through Redis
+        await message.reply(text=strings.get('broadcast', 'needs_redis'))
+        return
+    event_id = int(command.args) if command.args and command.args.strip().isdigit() else None
+    await state.set_state(BroadcastForm.text)
+    await state.update_data(event_id=event_id)
+    await message.reply(text=strings.get('broadcast', 'enter_text'))
+
+
+@admin_broadcast_router.message(BroadcastForm.text)
+async def broadcast_text_handler(message: Message, state: FSMContext) -> None:
+    await state.update_data(text=message.html_text)
+    await state.set_state(BroadcastForm.validate)
+    await message.answer(
+        text=f"{strings.get('broadcast', 'approve_broadcast')}\n\n{message.html_text}",
+        reply_markup=MainKeyboards.yes_no_keyboard(),
+        parse_mode=ParseMode.HTML
+    )
+
+
+@admin_broadcast_router.callback_query(BroadcastForm.validate)
+async def broadcast_validate_handler(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.message.edit_reply_markup(reply_markup=None)
+    if callback.data == 'yes':
+        data = await state.get_data()
+        async with async_session() as s:
+            broadcast = Broadcast(
+                text=data['text'],
+                event_id=data.get('event_id'),
+                admin_chat_id=callback.message.chat.id
+            )
+            s.add(broadcast)
+        # Publishing to the broker is a blocking call
+        await asyncio.get_running_loop().run_in_executor(None, send_broadcast.delay, broadcast.id)
+        await callback.message.reply(
+            text=strings.get('broadcast', 'broadcast_started').format(broadcast_id=broadcast.id)
+        )
+    else:
+        await callback.message.reply(
+            text=strings.get('broadcast', 'broadcast_canceled')
+        )
+    await state.clear()
@@ -6,20 +6,24 @@ from aiogram import Router, F
 
 from aiogram.types import Message, CallbackQuery
 from aiogram.enums.parse_mode import ParseMode
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 
-from database.models.events import Event, EventRegistration
-from database.base import session
+from database.models.events import Event
+from database.base import async_session
+from database.connector import DbConnector
 
 from bot.filters.role_filter import AdminFilter
 from bot.utils.keyboards import MainKeyboards, EventKeyboards
-from bot.utils.utils import generate_event_text
+from bot.utils.utils import generate_event_text, parse_registration_selector
 
 from bot.states.event import CreationEventForm, RejectEventRegistrationForm
 
-from configuration import ua_config
+from services.notifications import Notification, NotificationQueue
+from services.cache_invalidation import InvalidationListener, EVENTS_TOPIC, REGISTRATIONS_TOPIC
+from services.join_requests import ApprovedMembers
+
+from bot.utils.strings import strings
 
 admin_event_router = Router()
 
@@ -28,21 +32,21 @@ admin_event_router = Router()
 async def event_creation_handler(message: Message, state: FSMContext) -> None:
     await state.clear()
     await state.set_state(CreationEventForm.title)
-    await message.reply(text=ua_config.get('event_creation', 'title'))
+    await message.reply(text=strings.get('event_creation', 'title'))
 
 
 @admin_event_router.message(CreationEventForm.title)
 async def event_creation_handler(message: Message, state: FSMContext) -> None:
     await state.update_data(title=message.text)
     await state.set_state(CreationEventForm.description)
-    await message.reply(text=ua_config.get('event_creation', 'description'))
+    await message.reply(text=strings.get('event_creation', 'description'))
 
 
 @admin_event_router.message(CreationEventForm.description)
 async def event_creation_handler(message: Message, state: FSMContext) -> None:
     await state.update_data(description=message.text)
     await state.set_state(CreationEventForm.photo)
-    await message.reply(text=ua_config.get('event_creation', 'photo'))
+    await message.reply(text=strings.get('event_creation', 'photo'))
 
 
 @admin_event_router.message(CreationEventForm.photo)
@@ -55,7 +59,7 @@ async def event_creation_handler(message: Message, state: FSMContext) -> None:
     description = data['description']
     photo = data['photo']
     event_text = await generate_event_text(title, description)
-    creation_text = ua_config.get('event_creation', 'approve_creation_text')
+    creation_text = strings.get('event_creation', 'approve_creation_text')
     await message.bot.send_photo(
         caption=f'{creation_text}\n\n{event_text}',
         photo=photo,
@@ -78,70 +82,83 @@ async def event_creation_handler(callback: CallbackQuery, state: FSMContext) ->
         title = data['title']
         description = data['description']
         photo = data['photo']
-        with session() as s:
+        async with async_session() as s:
             event = Event(
                 title=title,
                 description=description,
                 photo=photo
             )
             s.add(event)
+        await InvalidationListener().publish(EVENTS_TOPIC)
         await callback.message.reply(
-            text=ua_config.get('event_creation', 'event_created')
+            text=strings.get('event_creation', 'event_created')
         )
     else:
         await callback.message.reply(
-            text=ua_config.get('event_creation', 'event_creation_canceled')
+            text=strings.get('event_creation', 'event_creation_canceled')
         )
     await state.clear()
 
 
 @admin_event_router.message(Command(commands=['approve_event_registration']), AdminFilter())
-async def approve_event_registration_handler(message: Message, state: FSMContext) -> None:
+async def approve_event_registration_handler(message: Message, command: CommandObject, state: FSMContext) -> None:
     await state.clear()
-    registration_id = int(message.text.split()[-1])
-    with session() as s:
-        registration = s.query(EventRegistration).filter(EventRegistration.id == registration_id, EventRegistration.is_approved == False).first()
-        if registration:
-            registration.is_approved = True
-            event = registration.event
-    if registration:
-        user_to_sent = registration.user_id
-        await message.bot.send_message(
-            chat_id=user_to_sent,
-            text=ua_config.get('event_admin_prompts', 'registration_approved').format(event_name=event.title),
+    selector = parse_registration_selector(command.args)
+    if selector is None:
+        await message.reply(text=strings.get('event_admin_prompts', 'bulk_usage'))
+        return
+    registrations = await DbConnector().approve_registrations(selector)
+    if not registrations:
+        await message.reply(text=strings.get('event_admin_prompts', 'registrations_not_found'))
+        return
+    # Approved users follow their invite links right away, let them in without waiting for other processes
+    ApprovedMembers().add((registration.user_id, registration.member_chat_id) for registration in registrations
+                          if registration.member_chat_id is not None)
+    await InvalidationListener().publish(REGISTRATIONS_TOPIC)
+    notifications = [
+        Notification(
+            chat_id=registration.user_id,
+            text=strings.get('event_admin_prompts', 'registration_approved').format(event_name=registration.title),
             reply_markup=EventKeyboards.generate_chat_invite_keyboard(registration.invite_link)
         )
-        await message.reply(
-            text='Sent'
-        )
+        for registration in registrations
+    ]
+    progress_message = await message.reply(
+        text=strings.get('event_admin_prompts', 'notifications_progress').format(sent=0, total=len(notifications))
+    )
+    NotificationQueue().submit(message.bot, notifications, progress_message)
 
 
 @admin_event_router.message(Command(commands=['reject_event_registration']), AdminFilter())
-async def reject_event_registration_handler(message: Message, state: FSMContext) -> None:
+async def reject_event_registration_handler(message: Message, command: CommandObject, state: FSMContext) -> None:
     await state.clear()
+    if parse_registration_selector(command.args) is None:
+        await message.reply(text=strings.get('event_admin_prompts', 'bulk_usage'))
+        return
     await state.set_state(RejectEventRegistrationForm.rejection_reason)
-    registration_id = int(message.text.split()[-1])
-    await state.update_data(registration_id=registration_id)
-    await message.reply(text=ua_config.get('event_admin_prompts', 'enter_reject_reason'))
+    await state.update_data(registrations=command.args)
+    await message.reply(text=strings.get('event_admin_prompts', 'enter_reject_reason'))
 
 
 @admin_event_router.message(RejectEventRegistrationForm.rejection_reason)
 async def rejection_reason_handler(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
-    registration_id = data['registration_id']
-    with session() as s:
-        registration = s.query(EventRegistration).filter(EventRegistration.id == registration_id, EventRegistration.is_approved == False).first()
-        if registration:
-            registration.is_approved = True
-            event = registration.event
-            s.delete(registration)
-    if registration:
-        user_to_sent = registration.user_id
-        await message.bot.send_message(
-            chat_id=user_to_sent,
-            text=ua_config.get('event_admin_prompts', 'reject_registration').format(event_name=event.title, decline_reason=message.text)
-        )
-        await message.reply(
-            text='Sent'
-        )
     await state.clear()
+    registrations = await DbConnector().reject_registrations(parse_registration_selector(data['registrations']))
+    if not registrations:
+        await message.reply(text=strings.get('event_admin_prompts', 'registrations_not_found'))
+        return
+    # Rejections free places on the events
+    await InvalidationListener().publish(EVENTS_TOPIC)
+    notifications = [
+        Notification(
+            chat_id=registration.user_id,
+            text=strings.get('event_admin_prompts', 'reject_registration').format(event_name=registration.title,
+                                                                                 decline_reason=message.text)
+        )
+        for registration in registrations
+    ]
+    progress_message = await message.reply(
+        text=strings.get('event_admin_prompts', 'notifications_progress').format(sent=0, total=len(notifications))
+    )
+    NotificationQueue().submit(message.bot, notifications, progress_message)
@@ -14,34 +14,40 @@ from aiogram.methods.ban_chat_member import BanChatMember
 
 from sqlalchemy import select
 
-from database.models.events import Event, EventRegistration
+from database.models.events import EventRegistration, RegistrationRefusal
 from database.models.user import User
-from database.base import session
+from database.base import async_session
 
 from bot.states.event import EventRegistrationForm
 from bot.utils.keyboards import EventKeyboards, MainKeyboards
-from bot.utils.utils import generate_event_text
 
-from configuration import ua_config
+from services.media_cache import MediaCache
+from services.open_events import OpenEventsCache
+from services.event_capacity import EventCapacity
+from services.join_requests import ApprovedMembers, JoinRequestWorker
+
+from bot.utils.strings import strings
 
 event_router = Router()
 
+REFUSAL_STRINGS = {
+    RegistrationRefusal.closed: 'registration_ends',
+    RegistrationRefusal.event_full: 'event_full',
+    RegistrationRefusal.already_registered: 'already_registered',
+}
+
 
 async def send_event_registration(event_id: int, message: Message, back_button=True):
-    with session() as s:
-        event = s.query(Event).filter(Event.id == event_id).first()
-    if not event or not event.is_registration_enabled:
+    event = await OpenEventsCache().get(event_id)
+    if not event:
         await message.answer(
-            text=ua_config.get('event_registrations', 'registration_ends')
+            text=strings.get('event_registrations', 'registration_ends')
         )
     else:
-        title = event.title
-        description = event.description
-        photo = event.photo
-        event_text = await generate_event_text(title, description)
-        await message.bot.send_photo(
-            caption=event_text,
-            photo=photo,
+        await MediaCache().send_photo(
+            message.bot,
+            caption=event.caption,
+            photo=event.photo,
             reply_markup=EventKeyboards.generate_event_register(event_id, back_button),
             parse_mode=ParseMode.MARKDOWN_V2,
             chat_id=message.chat.id
@@ -50,28 +56,24 @@ async def send_event_registration(event_id: int, message: Message, back_button=T
 
 async def send_events_main_page(message: Message, state: FSMContext, reply: bool = True):
     await state.clear()
-    with session() as s:
-        events = s.query(Event).filter(Event.is_registration_enabled == True).all()
-    events_to_render = []
-    for event in events:
-        events_to_render.append([event.id, event.title])
-    if len(events_to_render) == 0:
+    events = await OpenEventsCache().get_events()
+    if len(events) == 0:
         await message.answer(
-            text=ua_config.get('event_registrations', 'no_events')
+            text=strings.get('event_registrations', 'no_events')
         )
     elif reply:
         await message.reply(
-            text=ua_config.get('event_registrations', 'select_event'),
-            reply_markup=EventKeyboards.generate_event_list(events_to_render),
+            text=strings.get('event_registrations', 'select_event'),
+            reply_markup=events.keyboard(),
         )
     else:
         await message.answer(
-            text=ua_config.get('event_registrations', 'select_event'),
-            reply_markup=EventKeyboards.generate_event_list(events_to_render),
+            text=strings.get('event_registrations', 'select_event'),
+            reply_markup=events.keyboard(),
         )
 
 
-@event_router.message(F.text == ua_config.get('buttons', 'events'))
+@event_router.message(F.text.in_(strings.variants('buttons', 'events')))
 async def event_register_handler(message: Message, state: FSMContext) -> None:
     await send_events_main_page(message, state)
 
@@ -92,24 +94,29 @@ async def event_register_selection_handler(callback: CallbackQuery, state: FSMCo
     await callback.message.edit_reply_markup(
         reply_markup=None
     )
-    with session() as s:
-        event = s.query(Event).filter(Event.id == event_id).first()
-        event_registration = s.query(EventRegistration).filter(EventRegistration.event_id == event_id, EventRegistration.user_id == callback.from_user.id).first()
-    if not event or not event.is_registration_enabled:
+    event = await OpenEventsCache().get(event_id)
+    async with async_session() as s:
+        event_registration = await s.scalar(select(EventRegistration).where(EventRegistration.event_id == event_id, EventRegistration.user_id == callback.from_user.id))
+    if not event:
+        await state.clear()
+        await callback.message.answer(
+            text=strings.get('event_registrations', 'registration_ends')
+        )
+    elif EventCapacity().is_full(event_id):
         await state.clear()
         await callback.message.answer(
-            text=ua_config.get('event_registrations', 'registration_ends')
+            text=strings.get('event_registrations', 'event_full')
         )
     elif event_registration:
         await state.clear()
         await callback.message.answer(
-            text=ua_config.get('event_registrations', 'already_registered')
+            text=strings.get('event_registrations', 'already_registered')
         )
     else:
         await state.set_state(EventRegistrationForm.ami_student)
         await state.update_data(event_id=event_id)
         await callback.message.reply(
-            text=ua_config.get('event_registrations', 'is_ami_student'),
+            text=strings.get('event_registrations', 'is_ami_student'),
             reply_markup=MainKeyboards.yes_no_keyboard()
         )
 
@@ -118,7 +125,7 @@ async def event_register_selection_handler(callback: CallbackQuery, state: FSMCo
 async def event_register_is_ami_handler_handler(callback: CallbackQuery, state: FSMContext) -> None:
     await state.update_data(is_ami_student=True if callback.data == 'yes' else False)
     await callback.message.edit_text(
-        text=ua_config.get('event_registrations', 'enter_codingame_username'),
+        text=strings.get('event_registrations', 'enter_codingame_username'),
         parse_mode=ParseMode.MARKDOWN_V2
     )
     await state.set_state(EventRegistrationForm.codingame_username)
@@ -128,7 +135,7 @@ async def event_register_is_ami_handler_handler(callback: CallbackQuery, state:
 async def event_register_codingame_user_handler(message: Message, state: FSMContext) -> None:
     await state.update_data(codingame_username=message.text)
     await message.answer(
-        text=ua_config.get('event_registrations', 'division_selection_text'),
+        text=strings.get('event_registrations', 'division_selection_text'),
         reply_markup=EventKeyboards.generate_division_selection()
     )
     await state.set_state(EventRegistrationForm.division_selection)
@@ -136,9 +143,14 @@ async def event_register_codingame_user_handler(message: Message, state: FSMCont
 
 @event_router.callback_query(EventRegistrationForm.division_selection)
 async def event_register_codingame_user_handler(callback: CallbackQuery, state: FSMContext) -> None:
-    await state.update_data(division=1 if callback.data == 'first' else 2)
+    division = 1 if callback.data == 'first' else 2
+    data = await state.get_data()
+    if EventCapacity().is_full(data['event_id'], division):
+        await callback.answer(text=strings.get('event_registrations', 'division_full'), show_alert=True)
+        return
+    await state.update_data(division=division)
     await callback.message.edit_text(
-        text=ua_config.get('event_registrations', 'personal_info_processing'),
+        text=strings.get('event_registrations', 'personal_info_processing'),
         reply_markup=MainKeyboards.yes_keyboard()
     )
     await state.set_state(EventRegistrationForm.personal_info_processing_validation)
@@ -147,7 +159,7 @@ async def event_register_codingame_user_handler(callback: CallbackQuery, state:
 @event_router.callback_query(EventRegistrationForm.personal_info_processing_validation)
 async def event_register_personal_info_processing_validation_handler(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.message.edit_text(
-        text=ua_config.get('event_registrations', 'media_publishing_processing'),
+        text=strings.get('event_registrations', 'media_publishing_processing'),
         reply_markup=MainKeyboards.yes_keyboard()
     )
     await state.set_state(EventRegistrationForm.media_publishing_validation)
@@ -160,27 +172,38 @@ async def event_register_media_publishing_validation_handler(callback: CallbackQ
     is_ami_student = data['is_ami_student']
     codingame_username = data['codingame_username']
     division = data['division']
-    with session() as s:
-        event = s.query(Event).filter(Event.id == event_id).first()
-    if not event or not event.is_registration_enabled:
+    event = await OpenEventsCache().get(event_id)
+    if not event:
         await callback.message.edit_text(
-            text=ua_config.get('event_registrations', 'registration_ends'),
+            text=strings.get('event_registrations', 'registration_ends'),
             reply_markup=None
         )
     else:
-        with session() as s:
-            event_registration = EventRegistration(
-                event_id=event_id,
-                codingame_username=codingame_username,
-                division=division,
-                is_ami_student=is_ami_student,
-                user_id=callback.from_user.id,
-                invite_link=event.first_division_invite_link if division == 1 else event.second_division_invite_link,
-                member_chat_id=event.first_division_chat_id if division == 1 else event.second_division_chat_id
+        result = await EventCapacity().register(
+            event_id=event_id,
+            user_id=callback.from_user.id,
+            division=division,
+            codingame_username=codingame_username,
+            is_ami_student=is_ami_student,
+            invite_link=event.first_division_invite_link if division == 1 else event.second_division_invite_link,
+            member_chat_id=event.first_division_chat_id if division == 1 else event.second_division_chat_id
+        )
+        if result.refusal is RegistrationRefusal.division_full:
+            # The rest of the form stays valid, only another division has to be chosen
+            await callback.message.edit_text(
+                text=strings.get('event_registrations', 'division_full'),
+                reply_markup=EventKeyboards.generate_division_selection()
+            )
+            await state.set_state(EventRegistrationForm.division_selection)
+        elif result.refusal is not None:
+            await state.clear()
+            await callback.message.edit_text(
+                text=strings.get('event_registrations', REFUSAL_STRINGS[result.refusal]),
+                reply_markup=None
             )
-            s.add(event_registration)
+        else:
             await callback.message.edit_text(
-                text=ua_config.get('event_registrations', 'registration_completed'),
+                text=strings.get('event_registrations', 'registration_completed'),
                 reply_markup=None
             )
 
@@ -198,11 +221,5 @@ async def event_registration_back_handler(callback: CallbackQuery, state: FSMCon
 async def event_chat_join_request(request: ChatJoinRequest) -> None:
     user_id = request.from_user.id
     chat_id = request.chat.id
-    with session() as s:
-        registration = s.query(EventRegistration).filter(EventRegistration.user_id == user_id,
-                                                         EventRegistration.member_chat_id == str(chat_id),
-                                                         EventRegistration.is_approved == True).first()
-    if not registration:
-        await request.bot.decline_chat_join_request(chat_id=chat_id, user_id=user_id)
-    else:
-        await request.bot.approve_chat_join_request(chat_id=chat_id, user_id=user_id)
+    approve = await ApprovedMembers().is_approved(user_id, chat_id)
+    JoinRequestWorker().submit(request.bot, chat_id=chat_id, user_id=user_id, approve=approve)
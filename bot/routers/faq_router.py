@@ -1,122 +1,103 @@
 from __future__ import annotations
 
-from typing import Optional
-
 from aiogram import Router, F
 
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import (Message, CallbackQuery, InlineQuery, InlineQueryResultArticle,
+                           InputTextMessageContent)
 from aiogram.enums.parse_mode import ParseMode
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
-
-from database.models.faq import FAQCategory
-from database.base import session
 
-from bot.utils.keyboards import FAQKeyboards
+from bot.utils.callbacks import FAQCallback
+from bot.utils.utils import strip_markdown_escapes
 
-from bot.states.faq import FAQForm
+from services.faq_tree import FAQTreeCache
 
-from configuration import ua_config
+from bot.utils.strings import strings
 
 faq_router = Router()
 
-
-async def get_repositories_categories(parent_id: bool[int] = None):
-    faq_categories = []
-    with session() as s:
-        if parent_id:
-            res = s.query(FAQCategory).filter(FAQCategory.parent_id == parent_id)
-        else:
-            res = s.query(FAQCategory).filter(FAQCategory.leaf_category != None, FAQCategory.parent_id == None)
-        res = res.all()
-        for r in res:
-            faq_categories.append([r.id, r.title])
-    return faq_categories
+INLINE_SEARCH_LIMIT = 20
+INLINE_DESCRIPTION_LENGTH = 100
 
 
 async def send_main_faq_info(message: Message, inline_keyboard, change_message: bool = False) -> None:
     if change_message:
         await message.bot.edit_message_text(
-            text=ua_config.get('faq', 'faq_main'),
+            text=strings.get('faq', 'faq_main'),
             reply_markup=inline_keyboard,
             chat_id=message.chat.id,
             message_id=message.message_id
         )
     else:
-        await message.reply(text=ua_config.get('faq', 'faq_main'), reply_markup=inline_keyboard)
+        await message.reply(text=strings.get('faq', 'faq_main'), reply_markup=inline_keyboard)
 
 
-@faq_router.message(F.text == ua_config.get('buttons', 'faq'))
+@faq_router.message(F.text.in_(strings.variants('buttons', 'faq')))
 async def faq_handler(message: Message, state: FSMContext) -> None:
     await state.clear()
-    await state.set_state(FAQForm.selecting)
-    faq_categories = await get_repositories_categories()
-    await send_main_faq_info(message, inline_keyboard=FAQKeyboards.generate_faq_selection_list(faq_categories))
-
-
-@faq_router.callback_query(F.data.startswith('faq_category_select_'))
-async def process_category_select(callback: CallbackQuery, state: FSMContext) -> None:
-    current_id = int(callback.data.split('_')[-1])
-    data = await state.get_data()
-    new_parent = data.get('current_parent')
-    new_parent = await generate_new_parent_key(data.get('parent_id', ''), new_parent)
-    await state.update_data(**new_parent)
-    with session() as s:
-        current_category = s.query(FAQCategory).get(current_id)
-    if current_category.leaf_category:
+    tree = await FAQTreeCache().get_tree()
+    await send_main_faq_info(message, inline_keyboard=tree.keyboard())
+
+
+@faq_router.message(Command(commands=['faq']))
+async def faq_search_handler(message: Message, command: CommandObject, state: FSMContext) -> None:
+    if not command.args:
+        await faq_handler(message, state)
+        return
+    tree = await FAQTreeCache().get_tree()
+    found_categories = tree.search(command.args)
+    if found_categories:
+        await message.reply(
+            text=strings.get('faq', 'faq_search_results').format(query=command.args),
+            reply_markup=tree.search_keyboard(found_categories)
+        )
+    else:
+        await message.reply(text=strings.get('faq', 'faq_not_found').format(query=command.args))
+
+
+@faq_router.inline_query()
+async def faq_inline_search_handler(inline_query: InlineQuery) -> None:
+    tree = await FAQTreeCache().get_tree()
+    found_categories = tree.search(inline_query.query, INLINE_SEARCH_LIMIT) if inline_query.query else []
+    results = [
+        InlineQueryResultArticle(
+            id=str(category.id),
+            title=category.title or '',
+            description=strip_markdown_escapes(category.category_answer)[:INLINE_DESCRIPTION_LENGTH],
+            input_message_content=InputTextMessageContent(
+                message_text=category.category_answer,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_web_page_preview=True
+            )
+        )
+        for category in found_categories if category.category_answer
+    ]
+    await inline_query.answer(results=results, cache_time=300)
+
+
+@faq_router.callback_query(FAQCallback.filter())
+async def process_category_select(callback: CallbackQuery, callback_data: FAQCallback) -> None:
+    tree = await FAQTreeCache().get_tree()
+    current_id = callback_data.category_id
+    current_category = tree.get(current_id) if current_id is not None else None
+    if current_category is None:
+        await send_main_faq_info(callback.message, inline_keyboard=tree.keyboard(), change_message=True)
+    elif current_category.leaf_category:
         await callback.message.bot.edit_message_text(
             text=current_category.category_answer,
             chat_id=callback.message.chat.id,
             message_id=callback.message.message_id,
-            reply_markup=FAQKeyboards.generate_faq_selection_list([], True),
+            reply_markup=tree.keyboard(current_id),
             parse_mode=ParseMode.MARKDOWN_V2,
             disable_web_page_preview=True
         )
     else:
-        await state.update_data(current_parent=current_id)
-        faq_categories = await get_repositories_categories(parent_id=current_id)
-        await send_main_faq_info(callback.message, inline_keyboard=FAQKeyboards.generate_faq_selection_list(faq_categories, True), change_message=True)
-
-
-@faq_router.callback_query(F.data == 'faq_category_back')
-async def process_category_back(callback: CallbackQuery, state: FSMContext) -> None:
-    data = await state.get_data()
-    parent_id = data.get('parent_id')
-    current_parent = await get_new_current_parent(parent_id)
-    await state.update_data(**current_parent)
-    if parent_id is None or parent_id == '':
-        faq_categories = await get_repositories_categories()
-        await send_main_faq_info(callback.message,
-                                 inline_keyboard=FAQKeyboards.generate_faq_selection_list(faq_categories), change_message=True)
-    else:
-        faq_categories = await get_repositories_categories(int(parent_id.split(';')[-1]))
-        new_parent = await generate_new_parent_key(parent_id)
-        await state.update_data(**new_parent)
-        await send_main_faq_info(callback.message, inline_keyboard=FAQKeyboards.generate_faq_selection_list(faq_categories, True), change_message=True)
-
-
-async def generate_new_parent_key(parent_id: str, new_id: Optional[str] = None):
-    if new_id:
-        if parent_id:
-            parent_id = parent_id.split(';')
-        else:
-            parent_id = []
-        parent_id.append(str(new_id))
-    else:
-        parent_id = parent_id.split(';')[:-1]
-    update_data = {
-        'parent_id': ';'.join(parent_id)
-    }
-    return update_data
+        await send_main_faq_info(callback.message, inline_keyboard=tree.keyboard(current_id), change_message=True)
 
 
-async def get_new_current_parent(parent_id: str):
-    if parent_id:
-        current_parent = parent_id.split(';')[-1]
-    else:
-        current_parent = None
-    update_data = {
-        'current_parent': current_parent
-    }
-    return update_data
+@faq_router.callback_query(F.data.startswith('faq_category_'))
+async def process_legacy_category_select(callback: CallbackQuery) -> None:
+    """Buttons sent before breadcrumbs moved into callback data reopen the FAQ main menu."""
+    tree = await FAQTreeCache().get_tree()
+    await send_main_faq_info(callback.message, inline_keyboard=tree.keyboard(), change_message=True)
@@ -1,27 +1,37 @@
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.enums.parse_mode import ParseMode
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 from database.models.user import User
 from database.models.events import EventRegistration
-from database.base import session
+from database.base import async_session
+from database.connector import DbConnector
 
 from bot.utils.keyboards import MainKeyboards
 from bot.utils.keyboards import ProfileKeyboards, EventKeyboards
 from bot.utils.utils import gender_to_text, generate_event_text
+from bot.utils.callbacks import MyEventsCallback
 from bot.states.profile_managment import ManageProfileForm
 
-from configuration import ua_config
+from services.cache_invalidation import InvalidationListener, USERS_TOPIC
+from services.media_cache import MediaCache
+
+from bot.utils.strings import strings
+
+from configuration import MY_EVENTS_PAGE_SIZE
 
 profile_router = Router()
 
 
 async def send_main_profile_info(message: Message, user: User, edit_message: bool = False) -> None:
     gender = gender_to_text(user.gender)
-    profile_text = f"{ua_config.get('profile_prompts', 'profile_details').format(username=user.username, full_name=user.full_name or '-', instagram=user.instagram or '-', academic_group=user.academic_group or '-', gender=gender)}"
+    profile_text = f"{strings.get('profile_prompts', 'profile_details').format(username=user.username, full_name=user.full_name or '-', instagram=user.instagram or '-', academic_group=user.academic_group or '-', gender=gender)}"
     reply_markup = ProfileKeyboards.profile_keyboard()
     if not edit_message:
         await message.reply(
@@ -37,7 +47,7 @@ async def send_main_profile_info(message: Message, user: User, edit_message: boo
         )
 
 
-@profile_router.message(F.text == ua_config.get('buttons', 'profile'))
+@profile_router.message(F.text.in_(strings.variants('buttons', 'profile')))
 async def profile_handler(message: Message, user: User, state: FSMContext) -> None:
     await state.clear()
     await send_main_profile_info(message, user)
@@ -47,7 +57,7 @@ async def profile_handler(message: Message, user: User, state: FSMContext) -> No
 async def command_start_profile_editing(call: CallbackQuery, state: FSMContext) -> None:
     await state.set_state(ManageProfileForm.full_name)
     await state.update_data(prev_message_id=call.message.message_id)
-    await call.message.bot.edit_message_text(text=ua_config.get('profile_prompts', 'enter_full_name'),
+    await call.message.bot.edit_message_text(text=strings.get('profile_prompts', 'enter_full_name'),
                                              message_id=call.message.message_id,
                                              chat_id=call.message.chat.id,
                                              reply_markup=ProfileKeyboards.skip_question_keyboard())
@@ -63,17 +73,17 @@ async def process_validate_callback(call: CallbackQuery, state: FSMContext) -> N
     if current_state == ManageProfileForm.full_name.state:
         await state.update_data(full_name=data.get('reply_info'))
         await state.set_state(ManageProfileForm.academic_group)
-        text = ua_config.get('profile_prompts', 'enter_academic_group')
+        text = strings.get('profile_prompts', 'enter_academic_group')
         reply_markup = ProfileKeyboards.skip_question_keyboard()
     elif current_state == ManageProfileForm.academic_group.state:
         await state.update_data(academic_group=data.get('reply_info'))
         await state.set_state(ManageProfileForm.instagram)
-        text = ua_config.get('profile_prompts', 'enter_instagram')
+        text = strings.get('profile_prompts', 'enter_instagram')
         reply_markup = ProfileKeyboards.skip_question_keyboard()
     elif current_state == ManageProfileForm.instagram.state:
         await state.update_data(instagram=data.get('reply_info'))
         await state.set_state(ManageProfileForm.gender)
-        text = ua_config.get('profile_prompts', 'enter_gender')
+        text = strings.get('profile_prompts', 'enter_gender')
         reply_markup = ProfileKeyboards.gender_keyboard()
         new_message = True
 
@@ -93,11 +103,11 @@ async def process_validate_callback(call: CallbackQuery, state: FSMContext) -> N
 async def process_try_again_callback(call: CallbackQuery, state: FSMContext):
     current_state = await state.get_state()
     if current_state == ManageProfileForm.full_name.state:
-        text = ua_config.get('profile_prompts', 'enter_full_name')
+        text = strings.get('profile_prompts', 'enter_full_name')
     elif current_state == ManageProfileForm.instagram.state:
-        text = ua_config.get('profile_prompts', 'enter_instagram')
+        text = strings.get('profile_prompts', 'enter_instagram')
     elif current_state == ManageProfileForm.academic_group.state:
-        text = ua_config.get('profile_prompts', 'enter_academic_group')
+        text = strings.get('profile_prompts', 'enter_academic_group')
     else:
         text = "Unknown state"
 
@@ -118,17 +128,19 @@ async def process_gender(callback: CallbackQuery, state: FSMContext) -> None:
     )
     gender = callback.data if callback.data != 'skip_question' else None
     data = await state.get_data()
-    with session() as s:
+    async with async_session() as s:
         telegram_id = callback.from_user.id
-        user = s.query(User).filter(User.telegram_id == telegram_id).first()
+        user = await s.scalar(select(User).where(User.telegram_id == telegram_id))
         user.gender = gender
         user.full_name = data.get('full_name')
         user.academic_group = data.get('academic_group')
         user.instagram = data.get('instagram')
+    # Every bot process drops its copy, this one included
+    await InvalidationListener().publish(USERS_TOPIC, telegram_id)
 
     gender = gender_to_text(user.gender)
-    text = (f"{ua_config.get('profile_prompts', 'profile_updated')}\n\n"
-            f"{ua_config.get('profile_prompts', 'profile_details').format(username=user.username, full_name=user.full_name or '-', instagram=user.instagram or '-', academic_group=user.academic_group or '-', gender=gender)}")
+    text = (f"{strings.get('profile_prompts', 'profile_updated')}\n\n"
+            f"{strings.get('profile_prompts', 'profile_details').format(username=user.username, full_name=user.full_name or '-', instagram=user.instagram or '-', academic_group=user.academic_group or '-', gender=gender)}")
     await callback.message.answer(text)
 
 
@@ -146,7 +158,7 @@ async def process_manage_profile_reply(message: Message, state: FSMContext):
             reply_markup=None
         )
     await state.update_data(reply_info=message.text)
-    await message.reply(ua_config.get(
+    await message.reply(strings.get(
         'profile_prompts', 'validate_data'
     ).format(data=message.text), reply_markup=ProfileKeyboards.validate_keyboard())
 
@@ -158,7 +170,7 @@ async def process_manage_profile_reply(callback: CallbackQuery, state: FSMContex
     if callback.data == 'skip_question':
         await state.update_data(reply_info=None)
         message = await callback.message.bot.edit_message_text(
-            text=ua_config.get('profile_prompts', 'validate_skip_data'),
+            text=strings.get('profile_prompts', 'validate_skip_data'),
             reply_markup=ProfileKeyboards.validate_keyboard(),
             chat_id=callback.message.chat.id,
             message_id=callback.message.message_id
@@ -166,20 +178,26 @@ async def process_manage_profile_reply(callback: CallbackQuery, state: FSMContex
         await state.update_data(prev_message_id=message.message_id)
 
 
+async def my_events_keyboard(user_id: int, page: Optional[MyEventsCallback] = None):
+    registrations, has_newer, has_older = await DbConnector().get_registrations_page(
+        user_id, MY_EVENTS_PAGE_SIZE, after=page and page.after, before=page and page.before
+    )
+    return EventKeyboards.generate_my_event_list(
+        [[registration_id, title] for registration_id, title in registrations],
+        previous_page=MyEventsCallback(before=registrations[0].id) if has_newer and registrations else None,
+        next_page=MyEventsCallback(after=registrations[-1].id) if has_older and registrations else None
+    )
+
+
 @profile_router.callback_query(F.data == 'my_events')
-async def my_events_handler(callback: CallbackQuery, state: FSMContext) -> None:
-    my_events = []
-    with session() as s:
-        registrations = s.query(EventRegistration).filter(EventRegistration.user_id == callback.from_user.id).limit(5)
-        for registration in registrations:
-            my_events.append(
-                [registration.id, registration.event.title]
-            )
+@profile_router.callback_query(MyEventsCallback.filter())
+async def my_events_handler(callback: CallbackQuery, state: FSMContext,
+                            callback_data: Optional[MyEventsCallback] = None) -> None:
     await callback.message.bot.edit_message_text(
         message_id=callback.message.message_id,
         chat_id=callback.message.chat.id,
-        text=ua_config.get('profile_prompts', 'my_events'),
-        reply_markup=EventKeyboards.generate_my_event_list(my_events)
+        text=strings.get('profile_prompts', 'my_events'),
+        reply_markup=await my_events_keyboard(callback.from_user.id, callback_data)
     )
 
 
@@ -190,17 +208,22 @@ async def my_event_selection_handler(callback: CallbackQuery, state: FSMContext)
         message_id=callback.message.message_id
     )
     registration_id = int(callback.data.split('_')[-1])
-    with session() as s:
-        registration = s.query(EventRegistration).filter(EventRegistration.id == registration_id).first()
+    async with async_session() as s:
+        registration = await s.scalar(
+            select(EventRegistration)
+            .options(joinedload(EventRegistration.event))
+            .where(EventRegistration.id == registration_id)
+        )
         event = registration.event
     title = event.title
     description = event.description
     final_text = await generate_event_text(title, description)
-    current_status = ua_config.get('profile_prompts',
-                                   'registration_approved') if registration.is_approved else ua_config.get(
+    current_status = strings.get('profile_prompts',
+                                 'registration_approved') if registration.is_approved else strings.get(
         'profile_prompts', 'registration_awaiting_approval')
     final_text = f'{final_text}\n\n*{current_status}*'
-    await callback.message.bot.send_photo(
+    await MediaCache().send_photo(
+        callback.message.bot,
         chat_id=callback.message.chat.id,
         caption=final_text,
         photo=event.photo,
@@ -211,8 +234,8 @@ async def my_event_selection_handler(callback: CallbackQuery, state: FSMContext)
 
 @profile_router.callback_query(F.data == 'profile_back')
 async def profile_back_handler(callback: CallbackQuery, state: FSMContext) -> None:
-    with session() as s:
-        user = s.query(User).filter(User.telegram_id == callback.from_user.id).first()
+    async with async_session() as s:
+        user = await s.scalar(select(User).where(User.telegram_id == callback.from_user.id))
     await send_main_profile_info(message=callback.message, user=user, edit_message=True)
 
 
@@ -222,14 +245,7 @@ async def my_event_back_handler(callback: CallbackQuery, state: FSMContext) -> N
         chat_id=callback.message.chat.id,
         message_id=callback.message.message_id
     )
-    my_events = []
-    with session() as s:
-        registrations = s.query(EventRegistration).filter(EventRegistration.user_id == callback.from_user.id)
-        for registration in registrations:
-            my_events.append(
-                [registration.id, registration.event.title]
-            )
     await callback.message.answer(
-        text=ua_config.get('profile_prompts', 'my_events'),
-        reply_markup=EventKeyboards.generate_my_event_list(my_events)
+        text=strings.get('profile_prompts', 'my_events'),
+        reply_markup=await my_events_keyboard(callback.from_user.id)
     )
@@ -1,5 +0,0 @@
-from aiogram.fsm.state import State, StatesGroup
-
-
-class FAQForm(StatesGroup):
-    selecting = State()
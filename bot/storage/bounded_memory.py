@@ -0,0 +1,95 @@
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from configuration import FSM_MEMORY_SIZE, FSM_MEMORY_TTL
+
+
+class _Record:
+    __slots__ = ('state', 'data', 'expires_at')
+
+    def __init__(self, expires_at: float):
+        self.state: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self.expires_at = expires_at
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+        In-memory FSM storage for single-node deployments that does not grow
+        with abandoned flows: a record expires `ttl` seconds after its last
+        use, and the least recently used records are evicted once there are
+        more than `max_size` of them. Keys without state and data are not kept.
+
+        Every access renews the TTL, so records are ordered by expiry as well
+        and expired ones are always at the head of the LRU order.
+    """
+
+    def __init__(self, max_size: int = FSM_MEMORY_SIZE, ttl: int = FSM_MEMORY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._records: 'OrderedDict[StorageKey, _Record]' = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._records)
+
+    def _expire(self, now: float) -> None:
+        while self._records:
+            record = next(iter(self._records.values()))
+            if record.expires_at >= now:
+                return
+            self._records.popitem(last=False)
+            self.expirations += 1
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        now = time.monotonic()
+        self._expire(now)
+        record = self._records.get(key)
+        if record is not None:
+            record.expires_at = now + self.ttl
+            self._records.move_to_end(key)
+        return record
+
+    def _put(self, key: StorageKey) -> _Record:
+        record = self._get(key)
+        if record is None:
+            record = self._records[key] = _Record(time.monotonic() + self.ttl)
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+                self.evictions += 1
+        return record
+
+    def _discard_if_empty(self, key: StorageKey, record: _Record) -> None:
+        if record.state is None and not record.data:
+            self._records.pop(key, None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        record = self._put(key) if state is not None else self._get(key)
+        if record is not None:
+            record.state = state
+            self._discard_if_empty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self._put(key) if data else self._get(key)
+        if record is not None:
+            record.data = data.copy()
+            self._discard_if_empty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record is not None else {}
+
+    async def close(self) -> None:
+        self._records.clear()
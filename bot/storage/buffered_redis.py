@@ -0,0 +1,227 @@
+import time
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, Mapping, Optional, Tuple
+
+import orjson
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, KeyBuilder, RedisEventIsolation
+from aioredis import Redis
+
+from services.metrics import FSM_STORAGE_LATENCY
+
+from configuration import FSM_STATE_TTL, FSM_DATA_TTL, FSM_STATES_GROUP_TTLS
+
+
+class _Record:
+    """State and data of one storage key loaded for the update being handled."""
+
+    __slots__ = ('state', 'data', 'state_changed', 'data_changed', 'state_expires_in', 'data_expires_in')
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], state_expires_in: int, data_expires_in: int):
+        self.state = state
+        self.data = data
+        self.state_changed = False
+        self.data_changed = False
+        # Result of TTL, -1 for keys stored without expiry
+        self.state_expires_in = state_expires_in
+        self.data_expires_in = data_expires_in
+
+
+def _needs_refresh(expires_in: int, ttl: int) -> bool:
+    return expires_in == -1 or expires_in < ttl // 2
+
+
+# Keys locked by the isolation of the update being handled, mapped to their record once it is loaded
+_records: ContextVar[Optional[Dict[StorageKey, Optional[_Record]]]] = ContextVar('fsm_records', default=None)
+
+
+class BufferedRedisStorage(BaseStorage):
+    """
+        Redis FSM storage that reads state and data of a key with their TTLs
+        in one round trip the first time an update needs them, serves every
+        later get/set/update of the update from memory and writes the changes
+        back in one MULTI at its end. Data is serialized with orjson, so
+        records stay readable by the stock RedisStorage.
+
+        Buffering covers the key locked by the isolation of `create_isolation()`.
+        Other keys, e.g. the FSMContext of another user opened by a handler,
+        and calls made outside of updates (background tasks) go straight to Redis.
+
+        Keys expire after the (state TTL, data TTL) of the StatesGroup of the
+        state, or after the default TTLs for other states and data without a
+        state. The TTLs are renewed by the flush of an update that used the
+        key once less than half of them is left.
+    """
+
+    def __init__(self, redis: Redis, key_builder: Optional[KeyBuilder] = None,
+                 state_ttl: int = FSM_STATE_TTL, data_ttl: int = FSM_DATA_TTL,
+                 group_ttls: Mapping[str, Tuple[int, int]] = FSM_STATES_GROUP_TTLS):
+        self.redis = redis
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+        self.group_ttls = group_ttls
+
+    def ttls(self, state: Optional[str]) -> Tuple[int, int]:
+        """(state TTL, data TTL) of keys holding `state`."""
+        if state is None:
+            return self.state_ttl, self.data_ttl
+        return self.group_ttls.get(state.split(':', 1)[0], (self.state_ttl, self.data_ttl))
+
+    def create_isolation(self, distributed: bool = False) -> 'BufferedEventIsolation':
+        """
+            `distributed` isolates updates of a key with a Redis lock, needed when
+            updates of one user can reach several processes (webhook replicas).
+        """
+        if distributed:
+            return BufferedEventIsolation(self, RedisEventIsolation(self.redis, self.key_builder))
+        return BufferedEventIsolation(self, SimpleEventIsolation())
+
+    async def _load(self, key: StorageKey) -> Optional[_Record]:
+        records = _records.get()
+        if records is None or key not in records:
+            return None
+        record = records[key]
+        if record is None:
+            state_key = self.key_builder.build(key, 'state')
+            data_key = self.key_builder.build(key, 'data')
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.mget(state_key, data_key)
+                pipe.ttl(state_key)
+                pipe.ttl(data_key)
+                (state, data), state_expires_in, data_expires_in = await pipe.execute()
+            if isinstance(state, bytes):
+                state = state.decode('utf-8')
+            record = records[key] = _Record(state, orjson.loads(data) if data else {},
+                                            state_expires_in, data_expires_in)
+        return record
+
+    def discard(self, key: StorageKey) -> None:
+        records = _records.get()
+        if records is not None:
+            records.pop(key, None)
+
+    async def flush(self, key: StorageKey) -> None:
+        records = _records.get()
+        record = records.pop(key, None) if records is not None else None
+        if record is None:
+            return
+        state_ttl, data_ttl = self.ttls(record.state)
+        refresh_state = record.state is not None and _needs_refresh(record.state_expires_in, state_ttl)
+        # Data follows the TTL of the new group when the state changes
+        refresh_data = bool(record.data) and (record.state_changed
+                                              or _needs_refresh(record.data_expires_in, data_ttl))
+        if not (record.state_changed or record.data_changed or refresh_state or refresh_data):
+            return
+        started_at = time.perf_counter()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if record.state_changed:
+                self._write_state(pipe, key, record.state, state_ttl)
+            elif refresh_state:
+                pipe.expire(self.key_builder.build(key, 'state'), state_ttl)
+            if record.data_changed:
+                self._write_data(pipe, key, record.data, data_ttl)
+            elif refresh_data:
+                pipe.expire(self.key_builder.build(key, 'data'), data_ttl)
+            await pipe.execute()
+        FSM_STORAGE_LATENCY.labels('flush').observe(time.perf_counter() - started_at)
+
+    def _write_state(self, client: Redis, key: StorageKey, state: Optional[str], ttl: int):
+        redis_key = self.key_builder.build(key, 'state')
+        if state is None:
+            return client.delete(redis_key)
+        return client.set(redis_key, state, ex=ttl)
+
+    def _write_data(self, client: Redis, key: StorageKey, data: Dict[str, Any], ttl: int):
+        redis_key = self.key_builder.build(key, 'data')
+        if not data:
+            return client.delete(redis_key)
+        return client.set(redis_key, orjson.dumps(data), ex=ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        record = await self._load(key)
+        if record is None:
+            await self._write_state(self.redis, key, state, self.ttls(state)[0])
+            return
+        record.state = state
+        record.state_changed = True
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._load(key)
+        if record is None:
+            state = await self.redis.get(self.key_builder.build(key, 'state'))
+            return state.decode('utf-8') if isinstance(state, bytes) else state
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._load(key)
+        if record is None:
+            # The state is not known here, so the data gets the default TTL until the next update flushes it
+            await self._write_data(self.redis, key, data, self.data_ttl)
+            return
+        record.data = data.copy()
+        record.data_changed = True
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._load(key)
+        if record is None:
+            data = await self.redis.get(self.key_builder.build(key, 'data'))
+            return orjson.loads(data) if data else {}
+        return record.data.copy()
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        record = await self._load(key)
+        if record is None:
+            return await super().update_data(key, data)
+        record.data.update(data)
+        record.data_changed = True
+        return record.data.copy()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+class BufferedEventIsolation(BaseEventIsolation):
+    """
+        Isolates updates of a key with the inner isolation and buffers the
+        storage records for the time of the update. The whole record is
+        written back, so the inner isolation must exclude every other process
+        that can handle the same key: the in-process SimpleEventIsolation is
+        enough for polling, webhook replicas need RedisEventIsolation.
+
+        Changes are written back only when the update is handled without an
+        error, a failed handler leaves the stored state as it was before it.
+    """
+
+    def __init__(self, storage: BufferedRedisStorage, inner: BaseEventIsolation):
+        self.storage = storage
+        self.inner = inner
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.inner.lock(key):
+            records = _records.get()
+            token = None
+            if records is None:
+                records = {}
+                token = _records.set(records)
+            records[key] = None
+            try:
+                try:
+                    yield
+                except BaseException:
+                    self.storage.discard(key)
+                    raise
+                await self.storage.flush(key)
+            finally:
+                if token is not None:
+                    _records.reset(token)
+
+    async def close(self) -> None:
+        await self.inner.close()
@@ -0,0 +1,47 @@
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from services.metrics import FSM_STORAGE_LATENCY
+
+
+@contextmanager
+def _measure(operation: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        FSM_STORAGE_LATENCY.labels(operation).observe(time.perf_counter() - started_at)
+
+
+class MeasuredStorage(BaseStorage):
+    """Wraps an FSM storage to record the latency of its operations."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        with _measure('set_state'):
+            await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        with _measure('get_state'):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        with _measure('set_data'):
+            await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        with _measure('get_data'):
+            return await self.storage.get_data(key)
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        with _measure('update_data'):
+            return await self.storage.update_data(key, data)
+
+    async def close(self) -> None:
+        await self.storage.close()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import sys
+
+from typing import List, NamedTuple, Optional
+
+import aioredis
+
+from bot.storage.buffered_redis import BufferedRedisStorage
+
+from configuration import REDIS_URL, FSM_SWEEP_INTERVAL, FSM_SWEEP_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+STATE_SUFFIX = 'state'
+DATA_SUFFIX = 'data'
+
+
+class SweepReport(NamedTuple):
+    scanned: int
+    deleted: int
+    expiry_set: int
+    reclaimed_bytes: int
+
+
+class FSMSweeper:
+    """
+        Walks FSM keys with SCAN in batches and puts keys stored without an
+        expiry (written before TTLs were introduced, or by RedisStorage) on
+        the TTLs of their StatesGroup. Keys idle for longer than their TTL
+        are deleted right away, and the memory they held is reported.
+
+        Keys with a TTL are left to Redis. Every worker process runs a sweeper,
+        a lease key lets only one of them sweep per interval.
+    """
+
+    def __init__(self, storage: BufferedRedisStorage, interval: int = FSM_SWEEP_INTERVAL,
+                 batch_size: int = FSM_SWEEP_BATCH_SIZE):
+        self.storage = storage
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def _separator(self) -> str:
+        return getattr(self.storage.key_builder, 'separator', ':')
+
+    @property
+    def _prefix(self) -> str:
+        return getattr(self.storage.key_builder, 'prefix', 'fsm')
+
+    @property
+    def _lease_key(self) -> str:
+        return self._separator.join((self._prefix, 'sweeper'))
+
+    def _state_key(self, key: str) -> str:
+        return key[:-len(DATA_SUFFIX)] + STATE_SUFFIX if key.endswith(DATA_SUFFIX) else key
+
+    async def _sweep_batch(self, keys: List[str]) -> SweepReport:
+        redis = self.storage.redis
+        # OBJECT does not touch keys, so idle times are read before GET resets them
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+                pipe.object('idletime', key)
+            results = await pipe.execute()
+        persistent = [(key, idle) for key, ttl, idle in zip(keys, results[::2], results[1::2]) if ttl == -1]
+        if not persistent:
+            return SweepReport(len(keys), 0, 0, 0)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, _ in persistent:
+                pipe.memory_usage(key)
+                pipe.get(self._state_key(key))
+            results = await pipe.execute()
+
+        deleted, expiry_set, reclaimed_bytes = 0, 0, 0
+        async with redis.pipeline(transaction=False) as pipe:
+            for (key, idle), memory, state in zip(persistent, results[::2], results[1::2]):
+                if isinstance(state, bytes):
+                    state = state.decode('utf-8')
+                state_ttl, data_ttl = self.storage.ttls(state)
+                ttl = state_ttl if key.endswith(STATE_SUFFIX) else data_ttl
+                if idle is None or idle >= ttl:
+                    pipe.delete(key)
+                    deleted += 1
+                    reclaimed_bytes += memory or 0
+                else:
+                    pipe.expire(key, ttl - idle)
+                    expiry_set += 1
+            await pipe.execute()
+        return SweepReport(len(keys), deleted, expiry_set, reclaimed_bytes)
+
+    async def sweep(self) -> SweepReport:
+        scanned, deleted, expiry_set, reclaimed_bytes = 0, 0, 0, 0
+        pattern = self._separator.join((self._prefix, '*'))
+        cursor = 0
+        while True:
+            cursor, keys = await self.storage.redis.scan(cursor, match=pattern, count=self.batch_size)
+            keys = [key.decode('utf-8') if isinstance(key, bytes) else key for key in keys]
+            keys = [key for key in keys if key.endswith((self._separator + STATE_SUFFIX,
+                                                          self._separator + DATA_SUFFIX))]
+            if keys:
+                report = await self._sweep_batch(keys)
+                scanned += report.scanned
+                deleted += report.deleted
+                expiry_set += report.expiry_set
+                reclaimed_bytes += report.reclaimed_bytes
+            if not cursor:
+                break
+        report = SweepReport(scanned, deleted, expiry_set, reclaimed_bytes)
+        logger.info('FSM sweep: %s keys scanned, %s deleted, %s put on TTL, %s bytes reclaimed', *report)
+        return report
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            try:
+                if await self.storage.redis.set(self._lease_key, 1, nx=True, ex=self.interval):
+                    await self.sweep()
+            except Exception:
+                logger.exception('FSM sweep failed')
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+async def main() -> None:
+    storage = BufferedRedisStorage(aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True))
+    try:
+        await FSMSweeper(storage).sweep()
+    finally:
+        await storage.close()
+
+
+if __name__ == '__main__':
+    # One-off sweep: python -m bot.storage.sweeper
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+from typing import Optional, Sequence, Tuple
+
+from aiogram.filters.callback_data import CallbackData, MAX_CALLBACK_LENGTH
+
+FAQ_PATH_SEPARATOR = '.'
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _to_base36(value: int) -> str:
+    encoded = ''
+    while True:
+        value, digit = divmod(value, 36)
+        encoded = _DIGITS[digit] + encoded
+        if not value:
+            return encoded
+
+
+class FAQCallback(CallbackData, prefix='faq'):
+    """
+        Breadcrumb of opened FAQ categories: base36 ids from the root to the
+        current node joined with dots. An empty path is the FAQ main menu.
+    """
+    path: Optional[str] = None
+
+    @classmethod
+    def from_ids(cls, ids: Sequence[int]) -> 'FAQCallback':
+        max_length = MAX_CALLBACK_LENGTH - len(cls.__prefix__) - len(cls.__separator__)
+        path = FAQ_PATH_SEPARATOR.join(_to_base36(category_id) for category_id in ids)
+        # Only the last id is needed to open a node, so very deep paths lose their head
+        while len(path) > max_length and FAQ_PATH_SEPARATOR in path:
+            path = path.split(FAQ_PATH_SEPARATOR, 1)[1]
+        return cls(path=path)
+
+    @property
+    def ids(self) -> Tuple[int, ...]:
+        if not self.path:
+            return ()
+        return tuple(int(category_id, 36) for category_id in self.path.split(FAQ_PATH_SEPARATOR))
+
+    @property
+    def category_id(self) -> Optional[int]:
+        ids = self.ids
+        return ids[-1] if ids else None
+
+
+class MyEventsCallback(CallbackData, prefix='my_events_page'):
+    """
+        Keyset cursor of a "My events" page, registrations are listed from the newest.
+        `after` opens the page of registrations older than it, `before` the page of newer ones.
+    """
+    after: Optional[int] = None
+    before: Optional[int] = None
@@ -1,8 +1,33 @@
+from functools import wraps
+from typing import Callable, Dict, Optional, TypeVar
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton, ReplyKeyboardMarkup
 
 from bot.utils.constants import Gender
+from bot.utils.callbacks import FAQCallback, MyEventsCallback
+
+from bot.utils.strings import strings, current_locale
+
+from configuration import DONATION_LINK
+
+Markup = TypeVar('Markup', InlineKeyboardMarkup, ReplyKeyboardMarkup)
+
 
-from configuration import ua_config, DONATION_LINK
+def per_locale(build: Callable[[], Markup]) -> Callable[[], Markup]:
+    """
+    Build a keyboard without arguments once per locale and return copies of it afterwards.
+    Markups are mutable, so a caller changing its keyboard must not change the cached one.
+    """
+    keyboards: Dict[str, Markup] = {}
+
+    @wraps(build)
+    def keyboard() -> Markup:
+        locale = current_locale.get()
+        markup = keyboards.get(locale)
+        if markup is None:
+            markup = keyboards[locale] = build()
+        return markup.model_copy(deep=True)
+    return keyboard
 
 
 class MainKeyboards:
@@ -15,17 +40,18 @@ class MainKeyboards:
         return MainKeyboards.guest_keyboard()
 
     @staticmethod
+    @per_locale
     def guest_keyboard():
         result_kb = ReplyKeyboardMarkup(
             keyboard=[
                 [
-                    KeyboardButton(text=ua_config.get('buttons', 'profile')),
-                    KeyboardButton(text=ua_config.get('buttons', 'faq')),
-                    KeyboardButton(text=ua_config.get('buttons', 'help'))
+                    KeyboardButton(text=strings.get('buttons', 'profile')),
+                    KeyboardButton(text=strings.get('buttons', 'faq')),
+                    KeyboardButton(text=strings.get('buttons', 'help'))
                 ],
                 [
-                    KeyboardButton(text=ua_config.get('buttons', 'events')),
-                    KeyboardButton(text=ua_config.get('buttons', 'tumbochka'))
+                    KeyboardButton(text=strings.get('buttons', 'events')),
+                    KeyboardButton(text=strings.get('buttons', 'tumbochka'))
                 ]
             ],
             resize_keyboard=True
@@ -33,37 +59,40 @@ class MainKeyboards:
         return result_kb
 
     @staticmethod
+    @per_locale
     def yes_no_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('yes_no', 'yes'), callback_data='yes'),
-                    InlineKeyboardButton(text=ua_config.get('yes_no', 'no'), callback_data='no'),
+                    InlineKeyboardButton(text=strings.get('yes_no', 'yes'), callback_data='yes'),
+                    InlineKeyboardButton(text=strings.get('yes_no', 'no'), callback_data='no'),
                 ]
             ],
         )
         return keyboard
 
     @staticmethod
+    @per_locale
     def yes_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('yes_no', 'yes'), callback_data='yes'),
+                    InlineKeyboardButton(text=strings.get('yes_no', 'yes'), callback_data='yes'),
                 ]
             ],
         )
         return keyboard
 
     @staticmethod
+    @per_locale
     def tumbochka_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'donation_jar'), url=DONATION_LINK),
+                    InlineKeyboardButton(text=strings.get('buttons', 'donation_jar'), url=DONATION_LINK),
                 ],
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'close'), callback_data='close')
+                    InlineKeyboardButton(text=strings.get('buttons', 'close'), callback_data='close')
                 ]
             ],
         )
@@ -72,17 +101,18 @@ class MainKeyboards:
 
 class ProfileKeyboards:
     @staticmethod
+    @per_locale
     def profile_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'change_data'), callback_data='manage_profile')
+                    InlineKeyboardButton(text=strings.get('buttons', 'change_data'), callback_data='manage_profile')
                 ],
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'my_events'), callback_data='my_events')
+                    InlineKeyboardButton(text=strings.get('buttons', 'my_events'), callback_data='my_events')
                 ],
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'close'), callback_data='close')
+                    InlineKeyboardButton(text=strings.get('buttons', 'close'), callback_data='close')
                 ]
             ],
 
@@ -90,44 +120,47 @@ class ProfileKeyboards:
         return keyboard
 
     @staticmethod
+    @per_locale
     def skip_question_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'skip_question'), callback_data='skip_question')
+                    InlineKeyboardButton(text=strings.get('buttons', 'skip_question'), callback_data='skip_question')
                 ]
             ]
         )
         return keyboard
 
     @staticmethod
+    @per_locale
     def validate_keyboard():
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text=ua_config.get('buttons', 'again'), callback_data='try_again'),
-                InlineKeyboardButton(text=ua_config.get('buttons', 'validate'), callback_data='validate')
+                InlineKeyboardButton(text=strings.get('buttons', 'again'), callback_data='try_again'),
+                InlineKeyboardButton(text=strings.get('buttons', 'validate'), callback_data='validate')
             ]
         ])
         return keyboard
 
     @staticmethod
+    @per_locale
     def gender_keyboard():
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
-                    InlineKeyboardButton(text=ua_config.get('genders', 'female'),
+                    InlineKeyboardButton(text=strings.get('genders', 'female'),
                                          callback_data=str(Gender.female.name)),
-                    InlineKeyboardButton(text=ua_config.get('genders', 'male'),
+                    InlineKeyboardButton(text=strings.get('genders', 'male'),
                                          callback_data=str(Gender.male.name))
                 ],
                 [
-                    InlineKeyboardButton(text=ua_config.get('genders', 'nonbinary_gender'),
+                    InlineKeyboardButton(text=strings.get('genders', 'nonbinary_gender'),
                                          callback_data=str(Gender.nonbinary_gender.name)),
-                    InlineKeyboardButton(text=ua_config.get('genders', 'other_gender'),
+                    InlineKeyboardButton(text=strings.get('genders', 'other_gender'),
                                          callback_data=str(Gender.other_gender.name))
                 ],
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'skip_question'), callback_data='skip_question')
+                    InlineKeyboardButton(text=strings.get('buttons', 'skip_question'), callback_data='skip_question')
                 ]
             ]
         )
@@ -137,24 +170,31 @@ class ProfileKeyboards:
 class FAQKeyboards:
 
     @staticmethod
-    def generate_faq_selection_list(faq_categories: list[list[int, str]], back_button: bool = False):
+    def generate_faq_selection_list(faq_categories: list[list[tuple[int, ...], str]],
+                                    back_path: Optional[tuple[int, ...]] = None):
+        """
+        :param: faq_categories - pairs of the category path from the FAQ root and the category title
+        :param: back_path - path opened by the back button, None replaces it with the close button
+        """
         keyboard = InlineKeyboardMarkup(inline_keyboard=[])
-        for category_id, category_title in faq_categories:
+        for category_path, category_title in faq_categories:
             keyboard.inline_keyboard.append(
                 [
-                    InlineKeyboardButton(text=category_title, callback_data=f'faq_category_select_{category_id}')
+                    InlineKeyboardButton(text=category_title,
+                                         callback_data=FAQCallback.from_ids(category_path).pack())
                 ]
             )
-        if not back_button:
+        if back_path is None:
             keyboard.inline_keyboard.append(
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'close'), callback_data='close')
+                    InlineKeyboardButton(text=strings.get('buttons', 'close'), callback_data='close')
                 ]
             )
         else:
             keyboard.inline_keyboard.append(
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'back'), callback_data='faq_category_back')
+                    InlineKeyboardButton(text=strings.get('buttons', 'back'),
+                                         callback_data=FAQCallback.from_ids(back_path).pack())
                 ]
             )
         return keyboard
@@ -173,13 +213,18 @@ class EventKeyboards:
             )
         keyboard.inline_keyboard.append(
             [
-                InlineKeyboardButton(text=ua_config.get('buttons', 'close'), callback_data='close')
+                InlineKeyboardButton(text=strings.get('buttons', 'close'), callback_data='close')
             ]
         )
         return keyboard
 
     @staticmethod
-    def generate_my_event_list(events: list[list[int, str]], back_data='profile_back'):
+    def generate_my_event_list(events: list[list[int, str]], back_data='profile_back',
+                               previous_page: Optional[MyEventsCallback] = None,
+                               next_page: Optional[MyEventsCallback] = None):
+        """
+        :param: previous_page, next_page - cursors of the neighbour pages, None hides the page button
+        """
         keyboard = InlineKeyboardMarkup(inline_keyboard=[])
         for event_id, event_title in events:
             keyboard.inline_keyboard.append(
@@ -187,9 +232,18 @@ class EventKeyboards:
                     InlineKeyboardButton(text=event_title, callback_data=f'my_event_select_{event_id}')
                 ]
             )
+        pages_row = []
+        if previous_page is not None:
+            pages_row.append(InlineKeyboardButton(text=strings.get('buttons', 'previous_page'),
+                                                  callback_data=previous_page.pack()))
+        if next_page is not None:
+            pages_row.append(InlineKeyboardButton(text=strings.get('buttons', 'next_page'),
+                                                  callback_data=next_page.pack()))
+        if pages_row:
+            keyboard.inline_keyboard.append(pages_row)
         keyboard.inline_keyboard.append(
             [
-                InlineKeyboardButton(text=ua_config.get('buttons', 'back'), callback_data=back_data)
+                InlineKeyboardButton(text=strings.get('buttons', 'back'), callback_data=back_data)
             ]
         )
         return keyboard
@@ -198,26 +252,27 @@ class EventKeyboards:
     def generate_event_register(event_id, back_button=True):
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text=ua_config.get('event_registrations', 'register_on_event'), callback_data=f'event_register_{event_id}')
+                InlineKeyboardButton(text=strings.get('event_registrations', 'register_on_event'), callback_data=f'event_register_{event_id}')
             ]
         ])
         if back_button:
             keyboard.inline_keyboard.append(
                 [
-                    InlineKeyboardButton(text=ua_config.get('buttons', 'back'), callback_data='event_registration_back')
+                    InlineKeyboardButton(text=strings.get('buttons', 'back'), callback_data='event_registration_back')
                 ]
             )
         return keyboard
 
     @staticmethod
+    @per_locale
     def generate_division_selection():
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text=ua_config.get('event_registrations', 'professional'),
+                InlineKeyboardButton(text=strings.get('event_registrations', 'professional'),
                                      callback_data='first')
             ],
             [
-                InlineKeyboardButton(text=ua_config.get('event_registrations', 'newbies'), callback_data='second')
+                InlineKeyboardButton(text=strings.get('event_registrations', 'newbies'), callback_data='second')
             ]
         ])
         return keyboard
@@ -226,7 +281,7 @@ class EventKeyboards:
     def generate_chat_invite_keyboard(url):
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text=ua_config.get('event_admin_prompts', 'event_chat'),
+                InlineKeyboardButton(text=strings.get('event_admin_prompts', 'event_chat'),
                                      url=url)
             ]
         ])
@@ -0,0 +1,61 @@
+import configparser
+import os
+
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional
+
+from configuration import DEFAULT_LOCALE
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'locales')
+# Telegram language codes that differ from the names of locale directories
+LANGUAGE_LOCALES = {'uk': 'ua'}
+
+current_locale: ContextVar[str] = ContextVar('current_locale', default=DEFAULT_LOCALE)
+
+Catalog = Mapping[str, Mapping[str, str]]
+
+
+def compile_catalog(path: str) -> Catalog:
+    """Read strings.ini once and freeze its interpolated values into nested read-only mappings."""
+    parser = configparser.ConfigParser()
+    with open(path, encoding='utf-8') as f:
+        parser.read_file(f)
+    return MappingProxyType({
+        section: MappingProxyType(dict(parser.items(section)))
+        for section in parser.sections()
+    })
+
+
+class StringCatalog:
+    """
+        Localized bot strings of every locale in bot/locales. Lookups resolve
+        the locale of the update being handled and fall back to the default
+        locale for strings a translation does not have.
+    """
+
+    def __init__(self, locales_dir: str = LOCALES_DIR):
+        self.catalogs: Mapping[str, Catalog] = MappingProxyType({
+            locale: compile_catalog(os.path.join(locales_dir, locale, 'strings.ini'))
+            for locale in sorted(os.listdir(locales_dir))
+            if os.path.isfile(os.path.join(locales_dir, locale, 'strings.ini'))
+        })
+        self.default = self.catalogs[DEFAULT_LOCALE]
+
+    def resolve_locale(self, language_code: Optional[str]) -> str:
+        locale = LANGUAGE_LOCALES.get(language_code, language_code)
+        return locale if locale in self.catalogs else DEFAULT_LOCALE
+
+    def get(self, section: str, key: str, locale: Optional[str] = None) -> str:
+        catalog = self.catalogs.get(locale or current_locale.get(), self.default)
+        try:
+            return catalog[section][key]
+        except KeyError:
+            return self.default[section][key]
+
+    def variants(self, section: str, key: str) -> FrozenSet[str]:
+        """The string in every locale, e.g. to match reply keyboard buttons of any user."""
+        return frozenset(self.get(section, key, locale) for locale in self.catalogs)
+
+
+strings = StringCatalog()
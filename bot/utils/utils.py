@@ -1,19 +1,55 @@
-from configuration import ua_config
+import re
+
+from typing import NamedTuple, Optional, Tuple
+
+from bot.utils.strings import strings
 
 from bot.utils.constants import Gender
 
 
 def gender_to_text(gender: Gender) -> str:
     if gender == Gender.female or gender == Gender.female.name:
-        return ua_config.get('genders', 'female')
+        return strings.get('genders', 'female')
     if gender == Gender.male or gender == Gender.male.name:
-        return ua_config.get('genders', 'male')
+        return strings.get('genders', 'male')
     if gender == Gender.other_gender or gender == Gender.other_gender.name:
-        return ua_config.get('genders', 'other_gender')
+        return strings.get('genders', 'other_gender')
     if gender == Gender.nonbinary_gender or gender == Gender.nonbinary_gender.name:
-        return ua_config.get('genders', 'nonbinary_gender')
+        return strings.get('genders', 'nonbinary_gender')
     return '-'
 
 
 async def generate_event_text(title: str, description: str) -> str:
     return f'*{title}*\n\n{description}'
+
+
+def strip_markdown_escapes(text: str) -> str:
+    return re.sub(r'\\(.)', r'\1', text)
+
+
+class RegistrationSelector(NamedTuple):
+    ids: Tuple[int, ...] = ()
+    id_range: Optional[Tuple[int, int]] = None
+    event_id: Optional[int] = None
+    division: Optional[int] = None
+
+
+def parse_registration_selector(args: Optional[str]) -> Optional[RegistrationSelector]:
+    """
+    Parses the arguments of bulk registration commands:
+    "1 2 3" or "1,2,3" - registration ids, "10-50" - registration id range,
+    "all 7" - every registration on event 7, "all 7 2" - only its second division
+    """
+    tokens = (args or '').replace(',', ' ').split()
+    try:
+        if len(tokens) in (2, 3) and tokens[0] == 'all':
+            return RegistrationSelector(event_id=int(tokens[1]),
+                                        division=int(tokens[2]) if len(tokens) == 3 else None)
+        if len(tokens) == 1 and '-' in tokens[0]:
+            first_id, last_id = tokens[0].split('-')
+            return RegistrationSelector(id_range=(int(first_id), int(last_id)))
+        if tokens:
+            return RegistrationSelector(ids=tuple(int(token) for token in tokens))
+    except ValueError:
+        pass
+    return None
@@ -1,4 +1,3 @@
-import configparser
 import os
 
 from dotenv import load_dotenv
@@ -6,17 +5,79 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DB_URL = os.getenv('DB_URL')
+ASYNC_DB_URL = os.getenv('ASYNC_DB_URL')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 15))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 30))
+# Debug mode reporting N+1 statements, slow queries with their plans and handlers over the query budget
+DB_PROFILING = bool(os.getenv('DB_PROFILING'))
+DB_SLOW_QUERY_THRESHOLD = float(os.getenv('DB_SLOW_QUERY_THRESHOLD', 0.1))
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 3))
+DB_QUERY_BUDGET = int(os.getenv('DB_QUERY_BUDGET', 10))
+# Raise QueryBudgetExceeded instead of logging, for test and benchmark runs
+DB_QUERY_BUDGET_STRICT = bool(os.getenv('DB_QUERY_BUDGET_STRICT'))
 
 BOT_TOKEN = os.getenv('TOKEN')
 USE_REDIS = os.getenv('USE_REDIS')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/1')
+
+WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/bot/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', 1))
+POLLING_TIMEOUT = 30
 
 ADMIN_PANEL_PAGE_SIZE = 20
+MY_EVENTS_PAGE_SIZE = 5
 ADMIN_PANEL_SECRET_KEY = os.getenv('ADMIN_PANEL_SECRET_KEY')
 ADMIN_PANEL_BASIC_AUTH_USERNAME = os.getenv('ADMIN_PANEL_BASIC_AUTH_USERNAME')
 ADMIN_PANEL_BASIC_AUTH_PASSWORD = os.getenv('ADMIN_PANEL_BASIC_AUTH_PASSWORD')
 
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+USER_CACHE_FLUSH_INTERVAL = int(os.getenv('USER_CACHE_FLUSH_INTERVAL', 10))
+ADMIN_CACHE_TTL = int(os.getenv('ADMIN_CACHE_TTL', 300))
+FAQ_CACHE_TTL = int(os.getenv('FAQ_CACHE_TTL', 600))
+EVENTS_CACHE_TTL = int(os.getenv('EVENTS_CACHE_TTL', 60))
+EVENT_FULL_TTL = int(os.getenv('EVENT_FULL_TTL', 30))
+APPROVED_MEMBERS_TTL = int(os.getenv('APPROVED_MEMBERS_TTL', 600))
+FSM_MEMORY_SIZE = int(os.getenv('FSM_MEMORY_SIZE', 10000))
+FSM_MEMORY_TTL = int(os.getenv('FSM_MEMORY_TTL', 24 * 60 * 60))
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', 7 * 24 * 60 * 60))
+FSM_DATA_TTL = int(os.getenv('FSM_DATA_TTL', 7 * 24 * 60 * 60))
+# (state TTL, data TTL) by StatesGroup name, for flows often abandoned half-way
+FSM_STATES_GROUP_TTLS = {
+    'EventRegistrationForm': (2 * 24 * 60 * 60, 2 * 24 * 60 * 60),
+    'ManageProfileForm': (24 * 60 * 60, 24 * 60 * 60),
+    'RejectEventRegistrationForm': (24 * 60 * 60, 24 * 60 * 60),
+}
+FSM_SWEEP_INTERVAL = int(os.getenv('FSM_SWEEP_INTERVAL', 6 * 60 * 60))
+FSM_SWEEP_BATCH_SIZE = 500
+
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/2')
+BROADCAST_RATE = int(os.getenv('BROADCAST_RATE', 25))
+BROADCAST_BATCH_SIZE = 100
+BROADCAST_MAX_ATTEMPTS = 5
+# A running broadcast without a checkpoint for this long is taken over by another worker
+BROADCAST_LEASE_TIMEOUT = int(os.getenv('BROADCAST_LEASE_TIMEOUT', 120))
+NOTIFICATION_MAX_ATTEMPTS = 5
+
+OUTBOUND_RATE = int(os.getenv('OUTBOUND_RATE', 30))
+OUTBOUND_PRIVATE_CHAT_RATE = 1
+OUTBOUND_GROUP_CHAT_RATE = 20 / 60
+OUTBOUND_MAX_ATTEMPTS = 3
+JOIN_REQUEST_WORKERS = 4
+# Seconds the join requests left in the queue get to be answered on shutdown
+JOIN_REQUEST_DRAIN_TIMEOUT = 10
+
 DONATION_LINK = os.getenv('DONATION_LINK')
 DONATION_CARD_NUMBER = os.getenv('DONATION_CARD_NUMBER')
 
-ua_config = configparser.ConfigParser()
-ua_config.read('bot/locales/ua/strings.ini')
+DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'ua')
+
+# Prometheus metrics of the bot, 0 disables the endpoint.
+# Sharded workers need PROMETHEUS_MULTIPROC_DIR set to a directory emptied before the start.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
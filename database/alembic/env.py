@@ -21,6 +21,8 @@ if config.config_file_name is not None:
 from database.models.user import User
 from database.models.faq import FAQCategory
 from database.models.events import Event
+from database.models.broadcast import Broadcast
+from database.models.media import MediaFile
 target_metadata = Base.metadata
 
 config.set_main_option('sqlalchemy.url', DB_URL)
@@ -1,17 +1,29 @@
-from typing import ContextManager
+from typing import ContextManager, AsyncContextManager
 
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, sessionmaker, scoped_session
 
-from configuration import DB_URL
+from database.profiling import enable_profiling
+
+from configuration import DB_URL, ASYNC_DB_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_PROFILING
 
 Session = sessionmaker(expire_on_commit=False)
-engine = create_engine(DB_URL, pool_size=15, max_overflow=30)
+engine = create_engine(DB_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
 Session.configure(bind=engine)
 current_session = scoped_session(Session)
 
+AsyncSession = async_sessionmaker(expire_on_commit=False)
+async_engine = create_async_engine(ASYNC_DB_URL or make_url(DB_URL).set(drivername='postgresql+asyncpg'),
+                                   pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+AsyncSession.configure(bind=async_engine)
+
+if DB_PROFILING:
+    enable_profiling(engine)
+    enable_profiling(async_engine.sync_engine)
+
 
 @contextmanager
 def session(**kwargs) -> ContextManager[Session]:
@@ -28,5 +40,20 @@ def session(**kwargs) -> ContextManager[Session]:
         new_session.close()
 
 
+@asynccontextmanager
+async def async_session(**kwargs) -> AsyncContextManager[AsyncSession]:
+    """Provide a transactional scope around a series of operations without blocking the event loop."""
+    new_session = AsyncSession(**kwargs)
+    try:
+        yield new_session
+        await new_session.commit()
+    except Exception as e:
+        print(str(e))
+        await new_session.rollback()
+        raise
+    finally:
+        await new_session.close()
+
+
 class Base(DeclarativeBase):
     pass
@@ -1,8 +1,16 @@
 import logging
 
+from collections import Counter
+
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+
 from services.singleton import SingletonMeta
-from database.base import session, current_session
+from database.base import async_session, current_session
 from database.models.user import User
+from database.models.events import (Event, EventRegistration, RegistrationRefusal, RegistrationResult,
+                                    division_counter, change_taken_places)
+from database.models.media import MediaFile
 
 logger = logging.getLogger(__name__)
 
@@ -15,22 +23,182 @@ class DbConnector(metaclass=SingletonMeta):
     def __init__(self):
         self.Session = current_session
 
-    def get_or_create_user(self, telegram_id, username=None):
-        with session() as s:
-            res = s.query(User).filter(User.telegram_id == telegram_id).first()
-            if res is None:
-                user = User(telegram_id=telegram_id, username=username)
-                s.add(user)
-                s.commit()
-                res = user
+    async def upsert_user(self, telegram_id, username=None):
+        """Create the user or refresh its username in a single round trip."""
+        stmt = insert(User).values(telegram_id=telegram_id, username=username)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={'username': stmt.excluded.username}
+        ).returning(User)
+        async with async_session() as s:
+            res = await s.scalar(stmt, execution_options={'populate_existing': True})
 
         return res
 
-    def update_user(self, user: User):
-        with session() as s:
-            res = s.query(User).filter(User.telegram_id == user.telegram_id).first()
-
-            res.is_banned = user.is_banned
-            res.username = user.username
+    async def update_usernames(self, usernames: dict):
+        async with async_session() as s:
+            await s.execute(
+                update(User),
+                [{'telegram_id': telegram_id, 'username': username} for telegram_id, username in usernames.items()]
+            )
 
         return True
+
+    @staticmethod
+    def _registration_filters(selector):
+        registrations = EventRegistration.__table__
+        filters = [registrations.c.event_id == Event.__table__.c.id]
+        if selector.ids:
+            filters.append(registrations.c.id.in_(selector.ids))
+        if selector.id_range:
+            filters.append(registrations.c.id.between(*selector.id_range))
+        if selector.event_id is not None:
+            filters.append(registrations.c.event_id == selector.event_id)
+        if selector.division is not None:
+            filters.append(registrations.c.division == selector.division)
+        return filters
+
+    async def approve_registrations(self, selector):
+        """Approve every pending registration matched by the selector in one UPDATE ... RETURNING."""
+        registrations = EventRegistration.__table__
+        stmt = (
+            update(registrations)
+            .where(registrations.c.is_approved == False, *self._registration_filters(selector))
+            .values(is_approved=True)
+            .returning(registrations.c.id, registrations.c.user_id, registrations.c.invite_link,
+                       registrations.c.member_chat_id, Event.__table__.c.title)
+        )
+        async with async_session() as s:
+            res = (await s.execute(stmt)).all()
+
+        return res
+
+    async def reject_registrations(self, selector):
+        """Delete every pending registration matched by the selector in one DELETE ... RETURNING."""
+        registrations = EventRegistration.__table__
+        stmt = (
+            delete(registrations)
+            .where(registrations.c.is_approved == False, *self._registration_filters(selector))
+            .returning(registrations.c.id, registrations.c.user_id, registrations.c.event_id,
+                       registrations.c.division, Event.__table__.c.title)
+        )
+        async with async_session() as s:
+            res = (await s.execute(stmt)).all()
+            freed = Counter((registration.event_id, registration.division) for registration in res)
+            for (event_id, division), places in freed.items():
+                await s.execute(change_taken_places(event_id, division, -places))
+
+        return res
+
+    async def register_for_event(self, event_id, user_id, division, **fields):
+        """
+        Take a place on the event and its division and create the registration in one transaction.
+        When no place is taken the registrations table is not touched and the result tells why:
+        the registration is closed, or the event or the division is full.
+        A repeated submit of the same user takes no place and is refused as already registered
+        with the existing registration, also when the event has filled up since.
+        """
+        events = Event.__table__
+        division_count, division_capacity = division_counter(division)
+        reserve = (
+            update(events)
+            .where(
+                events.c.id == event_id,
+                events.c.is_registration_enabled == True,
+                or_(events.c.max_capacity.is_(None), events.c.registrations_count < events.c.max_capacity),
+                or_(division_capacity.is_(None), division_count < division_capacity)
+            )
+            .values({events.c.registrations_count: events.c.registrations_count + 1,
+                     division_count: division_count + 1})
+            .returning(events.c.id)
+        )
+        async with async_session() as s:
+            # The row lock taken by the UPDATE serializes concurrent registrations on the event
+            if await s.scalar(reserve) is None:
+                registration = await s.scalar(self._registration_query(event_id, user_id))
+                if registration is not None:
+                    return RegistrationResult(registration, RegistrationRefusal.already_registered)
+                return RegistrationResult(refusal=await self._registration_refusal(s, event_id))
+            registration = await s.scalar(
+                insert(EventRegistration)
+                .values(event_id=event_id, user_id=user_id, division=division, **fields)
+                .on_conflict_do_nothing(index_elements=[EventRegistration.event_id, EventRegistration.user_id])
+                .returning(EventRegistration)
+            )
+            if registration is None:
+                # Give the place back and return the registration of the first submit
+                await s.rollback()
+                registration = await s.scalar(self._registration_query(event_id, user_id))
+                return RegistrationResult(registration, RegistrationRefusal.already_registered)
+
+        return RegistrationResult(registration)
+
+    @staticmethod
+    def _registration_query(event_id, user_id):
+        return select(EventRegistration).where(EventRegistration.event_id == event_id,
+                                               EventRegistration.user_id == user_id)
+
+    async def get_registration(self, event_id, user_id):
+        async with async_session() as s:
+            res = await s.scalar(self._registration_query(event_id, user_id))
+
+        return res
+
+    @staticmethod
+    async def _registration_refusal(s, event_id):
+        event = (await s.execute(
+            select(Event.is_registration_enabled, Event.max_capacity, Event.registrations_count)
+            .where(Event.id == event_id)
+        )).one_or_none()
+        if event is None or not event.is_registration_enabled:
+            return RegistrationRefusal.closed
+        if event.max_capacity is not None and event.registrations_count >= event.max_capacity:
+            return RegistrationRefusal.event_full
+        return RegistrationRefusal.division_full
+
+    async def get_media_file_id(self, source_hash):
+        async with async_session() as s:
+            res = await s.scalar(select(MediaFile.file_id).where(MediaFile.source_hash == source_hash))
+
+        return res
+
+    async def save_media_file_id(self, source_hash, source, file_id):
+        stmt = insert(MediaFile).values(source_hash=source_hash, source=source, file_id=file_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaFile.source_hash],
+            set_={'file_id': stmt.excluded.file_id}
+        )
+        async with async_session() as s:
+            await s.execute(stmt)
+
+    async def delete_media_file_id(self, source_hash):
+        async with async_session() as s:
+            await s.execute(delete(MediaFile).where(MediaFile.source_hash == source_hash))
+
+    async def get_registrations_page(self, user_id, limit, after=None, before=None):
+        """
+        One page of (registration id, event title) of the user, newest registrations first.
+        Pages are addressed by keyset cursors: `after` - the last registration id of the previous page,
+        `before` - the first registration id of the next page.
+        Returns the page and whether there are newer and older registrations around it.
+        """
+        query = (
+            select(EventRegistration.id, Event.title)
+            .join(EventRegistration.event)
+            .where(EventRegistration.user_id == user_id)
+            .limit(limit + 1)
+        )
+        if before is not None:
+            query = query.where(EventRegistration.id > before).order_by(EventRegistration.id)
+        else:
+            if after is not None:
+                query = query.where(EventRegistration.id < after)
+            query = query.order_by(EventRegistration.id.desc())
+        async with async_session() as s:
+            rows = (await s.execute(query)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before is not None:
+            return rows[::-1], has_more, True
+        return rows, after is not None, has_more
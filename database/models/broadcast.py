@@ -0,0 +1,48 @@
+from typing import Optional
+
+import sqlalchemy as sa
+
+from datetime import datetime
+
+from flask_admin.contrib.sqla import ModelView
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+
+from database.base import Base
+
+from configuration import ADMIN_PANEL_PAGE_SIZE
+
+
+class BroadcastStatus:
+    pending = 'pending'
+    running = 'running'
+    finished = 'finished'
+
+
+class Broadcast(Base):
+    __tablename__ = 'broadcasts'
+    id: Mapped[int] = mapped_column(sa.BigInteger(), primary_key=True, autoincrement=True)
+    text: Mapped[str] = mapped_column(sa.Text())
+    event_id: Mapped[Optional[int]] = mapped_column(sa.ForeignKey("events.id"))
+    admin_chat_id: Mapped[int] = mapped_column(sa.BigInteger())
+    status: Mapped[str] = mapped_column(sa.String(), default=BroadcastStatus.pending)
+    last_user_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger())
+    sent_count: Mapped[int] = mapped_column(default=0)
+    failed_count: Mapped[int] = mapped_column(default=0)
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime(), default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]]
+    finished_at: Mapped[Optional[datetime]]
+    # Lease of the worker sending the broadcast, renewed at every checkpoint
+    claimed_by: Mapped[Optional[str]]
+    heartbeat_at: Mapped[Optional[datetime]]
+
+    def __repr__(self):
+        return f'< Broadcast: {self.id}, {self.status} >'
+
+
+class BroadcastView(ModelView):
+    can_create = False
+    column_list = ('id', 'event_id', 'status', 'sent_count', 'failed_count', 'created_at', 'finished_at')
+    form_columns = ('text', 'status')
+    column_filters = ('status', 'event_id')
+    page_size = ADMIN_PANEL_PAGE_SIZE
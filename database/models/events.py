@@ -1,4 +1,6 @@
-from typing import Optional
+import enum
+
+from typing import NamedTuple, Optional
 
 import sqlalchemy as sa
 
@@ -8,6 +10,9 @@ from sqlalchemy.orm import mapped_column, relationship
 from flask_admin.contrib.sqla import ModelView
 
 from database.base import Base
+
+from services.cache_invalidation import publish_invalidation, EVENTS_TOPIC, REGISTRATIONS_TOPIC
+
 from configuration import ADMIN_PANEL_PAGE_SIZE
 
 from datetime import datetime
@@ -23,24 +28,75 @@ class Event(Base):
     is_registration_enabled: Mapped[Optional[bool]] = mapped_column(sa.Boolean(), default=False)
     first_division_invite_link: Mapped[Optional[str]]
     second_division_invite_link: Mapped[Optional[str]]
-    first_division_chat_id: Mapped[Optional[str]]
-    second_division_chat_id: Mapped[Optional[str]]
+    first_division_chat_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger())
+    second_division_chat_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger())
+    first_division_capacity: Mapped[Optional[int]]
+    second_division_capacity: Mapped[Optional[int]]
+    # Taken places, changed only together with inserts and deletes of registrations
+    registrations_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    first_division_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    second_division_count: Mapped[int] = mapped_column(default=0, server_default='0')
 
     def __repr__(self):
         return f'< Event: {self.id}, {self.title} >'
 
 
+def division_counter(division: int):
+    """Columns of the events table holding the taken places and the capacity of the division."""
+    events = Event.__table__
+    if division == 1:
+        return events.c.first_division_count, events.c.first_division_capacity
+    return events.c.second_division_count, events.c.second_division_capacity
+
+
+def change_taken_places(event_id: int, division: int, delta: int):
+    events = Event.__table__
+    division_count, _ = division_counter(division)
+    return (
+        sa.update(events)
+        .where(events.c.id == event_id)
+        .values({events.c.registrations_count: events.c.registrations_count + delta,
+                 division_count: division_count + delta})
+    )
+
+
+class RegistrationRefusal(enum.Enum):
+    closed = 'closed'  # No such event or its registration is disabled
+    event_full = 'event_full'
+    division_full = 'division_full'
+    already_registered = 'already_registered'  # Comes with the existing registration
+
+
+class RegistrationResult(NamedTuple):
+    registration: Optional['EventRegistration'] = None
+    refusal: Optional[RegistrationRefusal] = None
+
+
 class EventView(ModelView):
-    column_list = ('id', 'title', 'description', 'max_capacity')
-    form_columns = ('id', 'title', 'description', 'photo', 'max_capacity', 'is_registration_enabled',
+    column_list = ('id', 'title', 'description', 'max_capacity', 'registrations_count')
+    form_columns = ('id', 'title', 'description', 'photo', 'max_capacity', 'first_division_capacity',
+                    'second_division_capacity', 'is_registration_enabled',
                     'first_division_invite_link', 'second_division_invite_link', 'first_division_chat_id',
                     'second_division_chat_id')
     column_searchable_list = ['title', 'description', 'id']
     page_size = ADMIN_PANEL_PAGE_SIZE
 
+    def after_model_change(self, form, model, is_created):
+        publish_invalidation(EVENTS_TOPIC)
+
+    def after_model_delete(self, model):
+        publish_invalidation(EVENTS_TOPIC)
+
 
 class EventRegistration(Base):
     __tablename__ = 'event_registrations'
+    __table_args__ = (
+        # One registration per user and event, also against double submits
+        sa.UniqueConstraint('event_id', 'user_id', name='uq_event_registrations_event_id_user_id'),
+        # Chat join requests; its user_id prefix also serves the lookups of the user's registrations
+        sa.Index('ix_event_registrations_user_id_member_chat_id_is_approved',
+                 'user_id', 'member_chat_id', 'is_approved'),
+    )
     id: Mapped[int] = mapped_column(sa.BigInteger(), primary_key=True, autoincrement=True)
     event_id: Mapped[int] = mapped_column(sa.ForeignKey("events.id"))
     user_id: Mapped[int] = mapped_column(sa.ForeignKey("users.telegram_id"))
@@ -49,7 +105,7 @@ class EventRegistration(Base):
     is_approved: Mapped[bool] = mapped_column(sa.Boolean(), default=False)
     division: Mapped[int]
     invite_link: Mapped[Optional[str]]
-    member_chat_id: Mapped[Optional[str]]
+    member_chat_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger())
 
     event = relationship("Event")
     user = relationship("User")
@@ -58,8 +114,35 @@ class EventRegistration(Base):
         return f'< Event registration: {self.id}, {self.event_id}>'
 
 
+def _previous_value(model, attribute: str):
+    """Value of the attribute as loaded from the database, before the form changed it."""
+    history = sa.inspect(model).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(model, attribute)
+
+
 class EventRegistrationView(ModelView):
     column_list = ('id', 'event_id', 'user_id', 'is_ami_student', 'codingame_username', 'is_approved', 'division', 'invite_link', 'member_chat_id')
     form_columns = ('id', 'event_id', 'user_id', 'is_ami_student', 'codingame_username', 'is_approved', 'division', 'invite_link', 'member_chat_id')
     column_filters = ('event_id', 'is_approved')
     page_size = ADMIN_PANEL_PAGE_SIZE
+
+    def on_model_change(self, form, model, is_created):
+        if is_created:
+            self.session.execute(change_taken_places(model.event_id, model.division, 1))
+            return
+        # A registration moved to another event or division frees its old place
+        old_place = (_previous_value(model, 'event_id'), _previous_value(model, 'division'))
+        if old_place != (model.event_id, model.division):
+            self.session.execute(change_taken_places(*old_place, -1))
+            self.session.execute(change_taken_places(model.event_id, model.division, 1))
+
+    def on_model_delete(self, model):
+        self.session.execute(change_taken_places(model.event_id, model.division, -1))
+
+    def after_model_change(self, form, model, is_created):
+        publish_invalidation(EVENTS_TOPIC)
+        publish_invalidation(REGISTRATIONS_TOPIC)
+
+    def after_model_delete(self, model):
+        publish_invalidation(EVENTS_TOPIC)
+        publish_invalidation(REGISTRATIONS_TOPIC)
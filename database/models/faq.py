@@ -10,6 +10,8 @@ from sqlalchemy.orm import mapped_column
 
 from database.base import Base
 
+from services.cache_invalidation import publish_invalidation, FAQ_TOPIC
+
 from configuration import ADMIN_PANEL_PAGE_SIZE
 
 
@@ -40,3 +42,9 @@ class FAQCategoryView(ModelView):
         }
     }
     page_size = ADMIN_PANEL_PAGE_SIZE
+
+    def after_model_change(self, form, model, is_created):
+        publish_invalidation(FAQ_TOPIC)
+
+    def after_model_delete(self, model):
+        publish_invalidation(FAQ_TOPIC)
@@ -0,0 +1,30 @@
+import sqlalchemy as sa
+
+from datetime import datetime
+
+from flask_admin.contrib.sqla import ModelView
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+
+from database.base import Base
+
+from configuration import ADMIN_PANEL_PAGE_SIZE
+
+
+class MediaFile(Base):
+    __tablename__ = 'media_files'
+    source_hash: Mapped[str] = mapped_column(sa.String(64), primary_key=True)
+    source: Mapped[str] = mapped_column(sa.Text())
+    file_id: Mapped[str] = mapped_column(sa.String())
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime(), default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'< MediaFile: {self.source} >'
+
+
+class MediaFileView(ModelView):
+    can_create = False
+    can_edit = False
+    column_list = ('source', 'file_id', 'created_at')
+    column_searchable_list = ['source']
+    page_size = ADMIN_PANEL_PAGE_SIZE
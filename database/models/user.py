@@ -13,6 +13,8 @@ from configuration import ADMIN_PANEL_PAGE_SIZE
 
 from bot.utils.constants import Gender
 
+from services.cache_invalidation import publish_invalidation, ADMINS_TOPIC, USERS_TOPIC
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -37,3 +39,15 @@ class UserView(ModelView):
     column_searchable_list = ['telegram_id', 'username', 'instagram']
     column_filters = ['academic_group', 'is_banned', 'is_admin']
     page_size = ADMIN_PANEL_PAGE_SIZE
+
+    def after_model_change(self, form, model, is_created):
+        if is_created or form.is_admin.data != form.is_admin.object_data:
+            publish_invalidation(ADMINS_TOPIC)
+        publish_invalidation(USERS_TOPIC, model.telegram_id)
+        if not is_created and form.telegram_id.object_data != model.telegram_id:
+            publish_invalidation(USERS_TOPIC, form.telegram_id.object_data)
+
+    def after_model_delete(self, model):
+        if model.is_admin:
+            publish_invalidation(ADMINS_TOPIC)
+        publish_invalidation(USERS_TOPIC, model.telegram_id)
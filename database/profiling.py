@@ -0,0 +1,91 @@
+import logging
+
+from contextlib import contextmanager
+from contextvars import Token
+from typing import Any, Iterator, Tuple
+
+from sqlalchemy.engine import Engine
+
+from services.metrics import UpdateStats, current_stats, instrument_engine, on_slow_query
+
+from configuration import DB_SLOW_QUERY_THRESHOLD, DB_N_PLUS_ONE_THRESHOLD, DB_QUERY_BUDGET, DB_QUERY_BUDGET_STRICT
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _scope_name(name: str, stats: UpdateStats) -> str:
+    return name if stats.handler == 'unhandled' else f'{name} handler {stats.handler}'
+
+
+def start_scope() -> Tuple[UpdateStats, Token]:
+    """Starts collecting statements, the token restores the previous stats with current_stats.reset."""
+    stats = UpdateStats(count_statements=True)
+    return stats, current_stats.set(stats)
+
+
+def report_scope(name: str, stats: UpdateStats, budget: int = DB_QUERY_BUDGET,
+                 strict: bool = DB_QUERY_BUDGET_STRICT) -> None:
+    """
+        Reports statements repeated at least DB_N_PLUS_ONE_THRESHOLD times and
+        checks the query budget. With `strict`, a scope over the budget raises
+        QueryBudgetExceeded, so test and benchmark runs fail on regressions.
+    """
+    name = _scope_name(name, stats)
+    for statement, count in stats.statements.items():
+        if count >= DB_N_PLUS_ONE_THRESHOLD:
+            logger.warning('Possible N+1 in %s, statement executed %s times:\n%s', name, count, statement)
+    if budget and stats.queries > budget:
+        message = f'{name} executed {stats.queries} queries in {stats.query_time:.3f} s, budget is {budget}'
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+@contextmanager
+def query_scope(name: str, budget: int = DB_QUERY_BUDGET, strict: bool = DB_QUERY_BUDGET_STRICT) -> Iterator[UpdateStats]:
+    """Collects the statements executed inside in the UpdateStats of the metrics and reports them at exit."""
+    stats, token = start_scope()
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+    report_scope(name, stats, budget, strict)
+
+
+def _explain(engine: Engine, statement: str, parameters: Any) -> str:
+    # A connection of its own keeps the profiled one untouched, and its raw cursor skips the cursor events
+    with engine.connect() as explain_conn:
+        cursor = explain_conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute('EXPLAIN ' + statement, parameters)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.close()
+
+
+def _log_slow_query(conn, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+    # Runs inside the cursor events of the profiled query, nothing here may fail it
+    try:
+        plan = ''
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            try:
+                plan = _explain(conn.engine, statement, parameters)
+            except Exception as e:
+                plan = f'EXPLAIN failed: {e}'
+        stats = current_stats.get()
+        logger.warning('Slow query in %s, %.3f s:\n%s\nParameters: %r\n%s',
+                       stats.handler if stats is not None else 'no scope', elapsed, statement, parameters, plan)
+    except Exception:
+        logger.exception('Failed to report a slow query')
+
+
+def enable_profiling(engine: Engine) -> None:
+    """Query timing comes from the metrics listeners, profiling adds the slow query report to them."""
+    on_slow_query(DB_SLOW_QUERY_THRESHOLD, _log_slow_query)
+    instrument_engine(engine)
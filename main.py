@@ -1,34 +1,209 @@
 import asyncio
+import hmac
 import logging
+import multiprocessing
+import signal
 import sys
 import aioredis
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage, BaseEventIsolation
+from aiogram.fsm.storage.memory import DisabledEventIsolation
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from configuration import BOT_TOKEN, USE_REDIS
+from configuration import (BOT_TOKEN, USE_REDIS, REDIS_URL, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+                           WEBHOOK_HOST, WEBHOOK_PORT, BOT_WORKERS, POLLING_TIMEOUT, DB_PROFILING)
 from bot.routers.main_router import main_router
 from bot.middlewares.user_base import UserToContextMiddleware, UpdateUsernameMiddleware
 from bot.middlewares.only_private import AnswerOnlyInPrivateChats
+from bot.middlewares.locale import LocaleMiddleware
+from bot.storage.buffered_redis import BufferedRedisStorage
+from bot.storage.bounded_memory import BoundedMemoryStorage
+from bot.storage.sweeper import FSMSweeper
+from bot.storage.measured import MeasuredStorage
+from bot.middlewares.outbound_rate_limit import OutboundRateLimitMiddleware
+from bot.middlewares.metrics import MetricsMiddleware, HandlerNameMiddleware, ApiMetricsMiddleware
+from bot.middlewares.query_profiler import QueryProfilerMiddleware
+from services.user_cache import UserCache
+from services.admin_cache import AdminCache
+from services.faq_tree import FAQTreeCache
+from services.open_events import OpenEventsCache
+from services.event_capacity import EventCapacity
+from services.join_requests import ApprovedMembers, JoinRequestWorker
+from services.cache_invalidation import InvalidationListener
+from services.notifications import NotificationQueue
+from services.sharding import UpdateSharder, consume_shard
+from services.metrics import instrument_engine, start_metrics_server
+from database.base import async_engine
 
+logger = logging.getLogger(__name__)
 
-async def main() -> None:
+
+def create_redis() -> aioredis.Redis:
+    return aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+
+
+def create_storage() -> BaseStorage:
     if USE_REDIS:
-        redis = aioredis.from_url("redis://redis:6379/1", encoding="utf8", decode_responses=True)
-        storage = RedisStorage(redis)
-    else:
-        storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+        return BufferedRedisStorage(create_redis())
+    return BoundedMemoryStorage()
+
+
+def create_events_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    if isinstance(storage, BufferedRedisStorage):
+        # Polling runs in one replica, updates of a user behind the webhook can reach any of them
+        return storage.create_isolation(distributed=bool(WEBHOOK_BASE_URL))
+    return DisabledEventIsolation()
+
+
+def create_dispatcher(storage: BaseStorage) -> Dispatcher:
+    dp = Dispatcher(storage=MeasuredStorage(storage), events_isolation=create_events_isolation(storage))
+    dp.update.outer_middleware(LocaleMiddleware())
+    if DB_PROFILING:
+        dp.update.outer_middleware(QueryProfilerMiddleware())
+    instrument_engine(async_engine.sync_engine)
+    for observer in (dp.message, dp.callback_query, dp.chat_join_request):
+        observer.outer_middleware(MetricsMiddleware())
+        # Inner middlewares of the dispatcher run for the handlers of every router
+        observer.middleware(HandlerNameMiddleware())
     dp.message.middleware(UserToContextMiddleware())
     dp.message.middleware(UpdateUsernameMiddleware())
     dp.message.middleware(AnswerOnlyInPrivateChats())
-    bot = Bot(BOT_TOKEN)
+    dp.startup.register(InvalidationListener().start)
+    dp.startup.register(UserCache().start)
+    dp.startup.register(AdminCache().start)
+    dp.startup.register(FAQTreeCache().start)
+    dp.startup.register(OpenEventsCache().start)
+    dp.startup.register(EventCapacity().start)
+    dp.startup.register(ApprovedMembers().start)
+    dp.startup.register(JoinRequestWorker().start)
+    dp.shutdown.register(NotificationQueue().stop)
+    dp.shutdown.register(JoinRequestWorker().stop)
+    dp.shutdown.register(UserCache().stop)
+    dp.shutdown.register(InvalidationListener().stop)
+    if isinstance(storage, BufferedRedisStorage):
+        sweeper = FSMSweeper(storage)
+        dp.startup.register(sweeper.start)
+        dp.shutdown.register(sweeper.stop)
     dp.include_router(main_router)
+    return dp
+
+
+def create_bot() -> Bot:
+    bot = Bot(BOT_TOKEN)
+    bot.session.middleware(OutboundRateLimitMiddleware(create_redis() if USE_REDIS else None))
+    bot.session.middleware(ApiMetricsMiddleware())
+    return bot
+
+
+async def set_webhook(bot: Bot) -> None:
+    webhook_url = f'{WEBHOOK_BASE_URL.rstrip("/")}{WEBHOOK_PATH}'
+    # Every worker behind nginx runs this hook, only the first one has to call setWebhook
+    webhook_info = await bot.get_webhook_info()
+    if webhook_info.url != webhook_url:
+        await bot.set_webhook(
+            url=webhook_url,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=main_router.resolve_used_update_types()
+        )
+        logger.info('Webhook set to %s', webhook_url)
+
+
+async def main() -> None:
+    dp = create_dispatcher(create_storage())
+    bot = create_bot()
     await dp.start_polling(bot)
 
 
+def main_webhook() -> None:
+    if not WEBHOOK_SECRET:
+        raise RuntimeError('WEBHOOK_SECRET must be set to receive updates through a webhook')
+    dp = create_dispatcher(create_storage())
+    dp.startup.register(set_webhook)
+    bot = create_bot()
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+
+
+def run_shard_worker(queue: multiprocessing.Queue) -> None:
+    # The receiving process stops workers through their queues, after the updates already queued
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    dp = create_dispatcher(create_storage())
+    asyncio.run(consume_shard(dp, create_bot(), queue))
+
+
+async def poll_into_shards(sharder: UpdateSharder) -> None:
+    bot = create_bot()
+    allowed_updates = main_router.resolve_used_update_types()
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=POLLING_TIMEOUT, allowed_updates=allowed_updates,
+                                            request_timeout=POLLING_TIMEOUT + 10)
+        except Exception:
+            logger.exception('Failed to fetch updates')
+            await asyncio.sleep(5)
+            continue
+        for update in updates:
+            sharder.submit(update)
+            offset = update.update_id + 1
+
+
+def create_sharding_webhook_app(sharder: UpdateSharder) -> web.Application:
+    async def handle_update(request: web.Request) -> web.Response:
+        secret_token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not hmac.compare_digest(secret_token, WEBHOOK_SECRET):
+            return web.Response(status=401, text='Unauthorized')
+        raw_update = await request.text()
+        sharder.submit(Update.model_validate_json(raw_update), raw_update)
+        return web.Response()
+
+    async def on_startup(app: web.Application) -> None:
+        bot = create_bot()
+        await set_webhook(bot)
+        await bot.session.close()
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.on_startup.append(on_startup)
+    return app
+
+
+def main_sharded() -> None:
+    """Receive updates in this process and handle them in BOT_WORKERS processes partitioned by user."""
+    if WEBHOOK_BASE_URL and not WEBHOOK_SECRET:
+        raise RuntimeError('WEBHOOK_SECRET must be set to receive updates through a webhook')
+    sharder = UpdateSharder(BOT_WORKERS, run_shard_worker)
+    sharder.start()
+    # docker stop sends SIGTERM: stop like on Ctrl+C, so the workers get their sentinels and shut down
+    # cleanly (the webhook server replaces this handler with its own graceful exit while it runs)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if WEBHOOK_BASE_URL:
+            web.run_app(create_sharding_webhook_app(sharder), host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+        else:
+            asyncio.run(poll_into_shards(sharder))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        sharder.stop()
+        logger.info('Bot workers stopped')
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
-    asyncio.run(main())
+    start_metrics_server()
+    if BOT_WORKERS > 1:
+        main_sharded()
+    elif WEBHOOK_BASE_URL:
+        main_webhook()
+    else:
+        asyncio.run(main())
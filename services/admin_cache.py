@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import time
+
+from typing import FrozenSet
+
+from sqlalchemy import select
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, ADMINS_TOPIC
+from database.base import async_session
+from database.models.user import User
+
+from configuration import ADMIN_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class AdminCache(metaclass=SingletonMeta):
+    """
+        In-memory set of admin telegram ids, reloaded on a TTL and whenever
+        the admin panel publishes an invalidation for the admins topic.
+    """
+
+    def __init__(self, ttl: int = ADMIN_CACHE_TTL):
+        self.ttl = ttl
+        self._admin_ids: FrozenSet[int] = frozenset()
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> None:
+        async with async_session() as s:
+            admin_ids = await s.scalars(select(User.telegram_id).where(User.is_admin == True))
+            self._admin_ids = frozenset(admin_ids)
+        self._expires_at = time.monotonic() + self.ttl
+
+    async def invalidate(self) -> None:
+        self._expires_at = 0.0
+
+    async def is_admin(self, telegram_id: int) -> bool:
+        if self._expires_at < time.monotonic():
+            async with self._lock:
+                # Another coroutine may have refreshed the set while we were waiting
+                if self._expires_at < time.monotonic():
+                    await self.refresh()
+        return telegram_id in self._admin_ids
+
+    async def start(self) -> None:
+        InvalidationListener().subscribe(ADMINS_TOPIC, self.invalidate)
+        await self.refresh()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.enums.parse_mode import ParseMode
+from sqlalchemy import select, update, func, or_, and_
+
+from services.rate_limiter import TokenBucket
+from services.notifications import Notification, deliver
+from database.base import async_session
+from database.models.broadcast import Broadcast, BroadcastStatus
+from database.models.events import EventRegistration
+from database.models.user import User
+
+from bot.utils.strings import strings
+
+from configuration import BROADCAST_RATE, BROADCAST_BATCH_SIZE, BROADCAST_MAX_ATTEMPTS, BROADCAST_LEASE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+def _recipients_query(broadcast: Broadcast):
+    if broadcast.event_id is None:
+        recipient_id = User.telegram_id
+        query = select(recipient_id).where(User.is_banned == False)
+    else:
+        recipient_id = EventRegistration.user_id
+        query = select(recipient_id).where(EventRegistration.event_id == broadcast.event_id).distinct()
+    if broadcast.last_user_id is not None:
+        query = query.where(recipient_id > broadcast.last_user_id)
+    return query.order_by(recipient_id).execution_options(yield_per=BROADCAST_BATCH_SIZE)
+
+
+async def _claim(broadcast_id: int, worker_id: str) -> Optional[Broadcast]:
+    """Take a pending broadcast, or a running one whose worker stopped renewing its lease."""
+    now = datetime.utcnow()
+    lease_expired = or_(Broadcast.heartbeat_at.is_(None),
+                        Broadcast.heartbeat_at < now - timedelta(seconds=BROADCAST_LEASE_TIMEOUT))
+    async with async_session() as s:
+        return await s.scalar(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id,
+                   or_(Broadcast.status == BroadcastStatus.pending,
+                       and_(Broadcast.status == BroadcastStatus.running, lease_expired)))
+            .values(status=BroadcastStatus.running, claimed_by=worker_id, heartbeat_at=now,
+                    started_at=func.coalesce(Broadcast.started_at, now))
+            .returning(Broadcast)
+        )
+
+
+async def _is_leased(broadcast_id: int) -> bool:
+    async with async_session() as s:
+        status = await s.scalar(select(Broadcast.status).where(Broadcast.id == broadcast_id))
+    return status == BroadcastStatus.running
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int) -> bool:
+    """
+        Send the broadcast to every recipient after its checkpoint, in
+        recipient id order. Progress is saved after every batch, so an
+        interrupted broadcast continues from the last saved batch.
+
+        Only the worker holding the lease sends. Returns False when another
+        worker holds a live lease, so the caller can check back once it could
+        have expired.
+    """
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    broadcast = await _claim(broadcast_id, worker_id)
+    if broadcast is None:
+        return not await _is_leased(broadcast_id)
+
+    bucket = TokenBucket(BROADCAST_RATE)
+    sent, failed = broadcast.sent_count, broadcast.failed_count
+    started_at = time.monotonic()
+    processed = 0
+    async with async_session() as s:
+        recipients = await s.stream_scalars(_recipients_query(broadcast))
+        async for batch in recipients.partitions(BROADCAST_BATCH_SIZE):
+            results = await asyncio.gather(*[
+                deliver(bot, bucket, Notification(user_id, broadcast.text, parse_mode=ParseMode.HTML),
+                        BROADCAST_MAX_ATTEMPTS)
+                for user_id in batch
+            ])
+            delivered = sum(results)
+            sent += delivered
+            failed += len(results) - delivered
+            processed += len(results)
+            async with async_session() as checkpoint:
+                renewed = await checkpoint.execute(
+                    update(Broadcast)
+                    .where(Broadcast.id == broadcast_id, Broadcast.claimed_by == worker_id)
+                    .values(last_user_id=batch[-1], sent_count=sent, failed_count=failed,
+                            heartbeat_at=datetime.utcnow())
+                )
+            if not renewed.rowcount:
+                logger.warning('Broadcast %s: lease taken over by another worker, stopping', broadcast_id)
+                return True
+            logger.info('Broadcast %s: %s sent, %s failed, %.1f messages/s', broadcast_id, sent, failed,
+                        processed / (time.monotonic() - started_at))
+
+    elapsed = time.monotonic() - started_at
+    async with async_session() as s:
+        await s.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.claimed_by == worker_id)
+            .values(status=BroadcastStatus.finished, finished_at=datetime.utcnow())
+        )
+    await bot.send_message(
+        chat_id=broadcast.admin_chat_id,
+        text=strings.get('broadcast', 'broadcast_finished').format(
+            broadcast_id=broadcast_id,
+            sent=sent,
+            failed=failed,
+            elapsed=round(elapsed, 1),
+            rate=round(processed / elapsed, 1) if elapsed else processed
+        )
+    )
+    return True
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aioredis
+import redis
+
+from services.singleton import SingletonMeta
+
+from configuration import USE_REDIS, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'amiautobot:cache_invalidation'
+
+ADMINS_TOPIC = 'admins'
+FAQ_TOPIC = 'faq'
+EVENTS_TOPIC = 'events'
+REGISTRATIONS_TOPIC = 'registrations'
+# Carries the telegram_id of the changed user
+USERS_TOPIC = 'users'
+
+
+def invalidation_message(topic: str, key: Optional[Any] = None) -> str:
+    return topic if key is None else f'{topic}:{key}'
+
+
+def publish_invalidation(topic: str, key: Optional[Any] = None) -> None:
+    """
+        Notify running bot processes that cached `topic` data is outdated,
+        only the entry `key` of it when given.
+        Used from synchronous code such as the Flask admin panel.
+    """
+    if not USE_REDIS:
+        return
+    try:
+        with redis.Redis.from_url(REDIS_URL) as client:
+            client.publish(INVALIDATION_CHANNEL, invalidation_message(topic, key))
+    except redis.RedisError:
+        logger.exception('Failed to publish %s cache invalidation', topic)
+
+
+class InvalidationListener(metaclass=SingletonMeta):
+    """
+        Dispatches cache invalidation messages published to Redis to the
+        in-process caches subscribed to their topic. Messages with a key are
+        passed to the callbacks as a string, without one the whole topic is
+        outdated and the callbacks are called without arguments.
+    """
+
+    reconnect_delay = 5
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[..., Awaitable[None]]]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, callback: Callable[..., Awaitable[None]]) -> None:
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    async def dispatch(self, message: str) -> None:
+        topic, _, key = message.partition(':')
+        for callback in self._callbacks.get(topic, []):
+            try:
+                await (callback(key) if key else callback())
+            except Exception:
+                logger.exception('Failed to invalidate %s cache', message)
+
+    async def publish(self, topic: str, key: Optional[Any] = None) -> None:
+        """Invalidate `topic` (or its entry `key`) in this process and, with Redis, in every other bot process."""
+        message = invalidation_message(topic, key)
+        if not USE_REDIS:
+            await self.dispatch(message)
+            return
+        client = aioredis.from_url(REDIS_URL, encoding='utf8', decode_responses=True)
+        try:
+            await client.publish(INVALIDATION_CHANNEL, message)
+        except aioredis.RedisError:
+            logger.exception('Failed to publish %s cache invalidation', message)
+            await self.dispatch(message)
+        finally:
+            await client.close()
+
+    async def _listen(self) -> None:
+        while True:
+            client = aioredis.from_url(REDIS_URL, encoding='utf8', decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        await self.dispatch(message['data'])
+            except aioredis.RedisError:
+                logger.exception('Cache invalidation listener disconnected')
+            finally:
+                await pubsub.close()
+                await client.close()
+            # Messages published while disconnected are lost, so drop everything cached
+            for topic in self._callbacks:
+                await self.dispatch(topic)
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        if USE_REDIS and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
@@ -0,0 +1,63 @@
+import logging
+import time
+
+from typing import Dict, Optional, Tuple
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, EVENTS_TOPIC
+from database.connector import DbConnector
+from database.models.events import RegistrationRefusal, RegistrationResult
+
+from configuration import EVENT_FULL_TTL
+
+logger = logging.getLogger(__name__)
+
+DIVISIONS = (1, 2)
+
+
+class EventCapacity(metaclass=SingletonMeta):
+    """
+        Takes places on events through the atomic counters of the events
+        table and remembers the divisions found full, so later attempts are
+        turned away without a database round trip. A full event as a whole is
+        marked with the division None. The marks are dropped on every events
+        invalidation, e.g. when places are freed or capacity grows.
+    """
+
+    def __init__(self, ttl: int = EVENT_FULL_TTL):
+        self.ttl = ttl
+        self._full: Dict[Tuple[int, Optional[int]], float] = {}
+
+    def _is_marked(self, event_id: int, division: Optional[int]) -> bool:
+        return self._full.get((event_id, division), 0.0) > time.monotonic()
+
+    def is_full(self, event_id: int, division: Optional[int] = None) -> bool:
+        """Without a division the event is full when it is full as a whole or every division of it is."""
+        if self._is_marked(event_id, None):
+            return True
+        divisions = DIVISIONS if division is None else (division,)
+        return all(self._is_marked(event_id, division) for division in divisions)
+
+    async def register(self, event_id: int, user_id: int, division: int, **fields) -> RegistrationResult:
+        if self._is_marked(event_id, None) or self._is_marked(event_id, division):
+            # A repeated submit is answered as such, not as a refusal for lack of places
+            registration = await DbConnector().get_registration(event_id, user_id)
+            if registration is not None:
+                return RegistrationResult(registration, RegistrationRefusal.already_registered)
+            if self._is_marked(event_id, None):
+                return RegistrationResult(refusal=RegistrationRefusal.event_full)
+            return RegistrationResult(refusal=RegistrationRefusal.division_full)
+        result = await DbConnector().register_for_event(event_id, user_id, division, **fields)
+        if result.refusal is RegistrationRefusal.event_full:
+            self._full[(event_id, None)] = time.monotonic() + self.ttl
+            logger.info('Event %s is full', event_id)
+        elif result.refusal is RegistrationRefusal.division_full:
+            self._full[(event_id, division)] = time.monotonic() + self.ttl
+            logger.info('Event %s division %s is full', event_id, division)
+        return result
+
+    async def invalidate(self) -> None:
+        self._full.clear()
+
+    async def start(self) -> None:
+        InvalidationListener().subscribe(EVENTS_TOPIC, self.invalidate)
@@ -0,0 +1,60 @@
+import heapq
+import math
+import re
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+TITLE_WEIGHT = 3.0
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower().replace('_', ' ')) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+class FAQSearchIndex:
+    """
+        Inverted index over the titles and answers of leaf FAQ categories.
+        Every query word matches indexed words equal to it or, with a lower
+        weight, starting with it, so partially typed words still find answers.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[int, str, str]]):
+        """
+        :param: documents - (category id, title, answer) of every leaf category
+        """
+        postings: Dict[str, Dict[int, float]] = {}
+        for document_id, title, answer in documents:
+            weights = Counter()
+            for token in tokenize(title or ''):
+                weights[token] += TITLE_WEIGHT
+            for token in tokenize(answer or ''):
+                weights[token] += 1.0
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[document_id] = weight
+        self._documents_count = len({document_id for documents in postings.values() for document_id in documents})
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + self._documents_count / len(self._postings[token]))
+
+    def _prefixed(self, prefix: str) -> Iterable[str]:
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            yield self._vocabulary[position]
+            position += 1
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        scores: Dict[int, float] = Counter()
+        for query_token in set(tokenize(query)):
+            for token in self._prefixed(query_token):
+                weight = self._idf(token) * (1.0 if token == query_token else PREFIX_WEIGHT)
+                for document_id, token_weight in self._postings[token].items():
+                    scores[document_id] += weight * token_weight
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [document_id for document_id, _ in ranked]
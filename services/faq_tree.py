@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, FAQ_TOPIC
+from services.faq_search import FAQSearchIndex
+from database.base import async_session
+from database.models.faq import FAQCategory
+
+from bot.utils.keyboards import FAQKeyboards
+from bot.utils.strings import current_locale
+
+from configuration import FAQ_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class FAQNode(NamedTuple):
+    id: int
+    title: Optional[str]
+    parent_id: Optional[int]
+    leaf_category: bool
+    category_answer: Optional[str]
+    children: Tuple[int, ...]
+    path: Tuple[int, ...]
+
+
+class FAQTree:
+    """
+        Immutable snapshot of the faq_categories table. The selection keyboards
+        of all nodes are built together the first time the tree is shown in a
+        locale, and every caller gets its own copy of them.
+        The root of the tree is addressed with None.
+    """
+
+    def __init__(self, categories: Iterable[FAQCategory]):
+        categories = sorted(categories, key=lambda category: category.id)
+        children: Dict[Optional[int], list] = {None: []}
+        for category in categories:
+            children.setdefault(category.parent_id, []).append(category.id)
+
+        parents = {category.id: category.parent_id for category in categories}
+        self._nodes: Dict[int, FAQNode] = {
+            category.id: FAQNode(
+                id=category.id,
+                title=category.title,
+                parent_id=category.parent_id,
+                leaf_category=category.leaf_category,
+                category_answer=category.category_answer,
+                children=tuple(children.get(category.id, ())),
+                path=self._build_path(category.id, parents),
+            )
+            for category in categories
+        }
+        self._roots: Tuple[int, ...] = tuple(children[None])
+        self._keyboards: Dict[str, Dict[Optional[int], InlineKeyboardMarkup]] = {}
+
+        self._search_index = FAQSearchIndex(
+            (node.id, node.title, node.category_answer) for node in self._nodes.values() if node.leaf_category
+        )
+
+    @staticmethod
+    def _build_path(node_id: int, parents: Dict[int, Optional[int]]) -> Tuple[int, ...]:
+        path = [node_id]
+        parent_id = parents.get(node_id)
+        while parent_id is not None and parent_id not in path:
+            path.append(parent_id)
+            parent_id = parents.get(parent_id)
+        return tuple(reversed(path))
+
+    def _build_keyboards(self) -> Dict[Optional[int], InlineKeyboardMarkup]:
+        keyboards = {None: FAQKeyboards.generate_faq_selection_list(self._titles(self._roots))}
+        for node in self._nodes.values():
+            back_path = node.path[:-1]
+            if node.leaf_category:
+                keyboards[node.id] = FAQKeyboards.generate_faq_selection_list([], back_path)
+            else:
+                keyboards[node.id] = FAQKeyboards.generate_faq_selection_list(self._titles(node.children), back_path)
+        return keyboards
+
+    def _titles(self, node_ids: Iterable[int]) -> list:
+        return [[self._nodes[node_id].path, self._nodes[node_id].title] for node_id in node_ids]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, node_id: int) -> Optional[FAQNode]:
+        return self._nodes.get(node_id)
+
+    def keyboard(self, node_id: Optional[int] = None) -> InlineKeyboardMarkup:
+        locale = current_locale.get()
+        keyboards = self._keyboards.get(locale)
+        if keyboards is None:
+            keyboards = self._keyboards[locale] = self._build_keyboards()
+        return keyboards[node_id].model_copy(deep=True)
+
+    def search(self, query: str, limit: int = 10) -> List[FAQNode]:
+        return [self._nodes[node_id] for node_id in self._search_index.search(query, limit)]
+
+    def search_keyboard(self, nodes: Iterable[FAQNode]) -> InlineKeyboardMarkup:
+        return FAQKeyboards.generate_faq_selection_list([[node.path, node.title] for node in nodes])
+
+
+class FAQTreeCache(metaclass=SingletonMeta):
+    """
+        Holds the current FAQTree and swaps it for a freshly built one when
+        the TTL runs out or the admin panel publishes a faq invalidation.
+    """
+
+    def __init__(self, ttl: int = FAQ_CACHE_TTL):
+        self.ttl = ttl
+        self._tree: Optional[FAQTree] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def reload(self) -> None:
+        async with async_session() as s:
+            categories = (await s.scalars(select(FAQCategory))).all()
+        tree = FAQTree(categories)
+        self._tree = tree
+        self._expires_at = time.monotonic() + self.ttl
+        logger.info('FAQ tree reloaded with %s categories', len(tree))
+
+    async def invalidate(self) -> None:
+        self._expires_at = 0.0
+
+    async def get_tree(self) -> FAQTree:
+        if self._tree is None or self._expires_at < time.monotonic():
+            async with self._lock:
+                if self._tree is None or self._expires_at < time.monotonic():
+                    await self.reload()
+        return self._tree
+
+    async def start(self) -> None:
+        InvalidationListener().subscribe(FAQ_TOPIC, self.invalidate)
+        await self.reload()
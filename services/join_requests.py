@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from sqlalchemy import select
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, REGISTRATIONS_TOPIC
+from services.metrics import JOIN_REQUEST_QUEUE_DEPTH
+from database.base import async_session
+from database.models.events import EventRegistration
+
+from configuration import APPROVED_MEMBERS_TTL, JOIN_REQUEST_WORKERS, JOIN_REQUEST_DRAIN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class ApprovedMembers(metaclass=SingletonMeta):
+    """
+        In-memory set of (user_id, chat_id) pairs of approved registrations,
+        so chat join requests are decided without a query. The set is loaded
+        in full at startup and is authoritative: a pair missing from it is
+        declined. Approvals add their pairs at once in the approving process
+        and reach the others with the registrations invalidation published
+        before the approved users get their invite links. The set is also
+        reloaded on a TTL.
+    """
+
+    def __init__(self, ttl: int = APPROVED_MEMBERS_TTL):
+        self.ttl = ttl
+        self._members: FrozenSet[Tuple[int, int]] = frozenset()
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def reload(self) -> None:
+        async with async_session() as s:
+            members = await s.execute(
+                select(EventRegistration.user_id, EventRegistration.member_chat_id)
+                .where(EventRegistration.is_approved == True, EventRegistration.member_chat_id.is_not(None))
+            )
+            self._members = frozenset((user_id, chat_id) for user_id, chat_id in members)
+        self._expires_at = time.monotonic() + self.ttl
+        logger.info('Approved members reloaded: %s', len(self._members))
+
+    async def invalidate(self) -> None:
+        self._expires_at = 0.0
+
+    def add(self, members: Iterable[Tuple[int, int]]) -> None:
+        self._members = self._members.union(members)
+
+    async def is_approved(self, user_id: int, chat_id: int) -> bool:
+        if self._expires_at < time.monotonic():
+            async with self._lock:
+                if self._expires_at < time.monotonic():
+                    await self.reload()
+        return (user_id, chat_id) in self._members
+
+    async def start(self) -> None:
+        InvalidationListener().subscribe(REGISTRATIONS_TOPIC, self.invalidate)
+        await self.reload()
+
+
+class JoinDecision(NamedTuple):
+    bot: Bot
+    chat_id: int
+    user_id: int
+    approve: bool
+
+
+class JoinRequestWorker(metaclass=SingletonMeta):
+    """
+        Answers chat join requests from a queue with a fixed number of workers,
+        so a burst of joins does not block update handling. The calls are paced
+        by OutboundRateLimitMiddleware of the bot, like every other call.
+    """
+
+    def __init__(self, workers: int = JOIN_REQUEST_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, bot: Bot, chat_id: int, user_id: int, approve: bool) -> None:
+        # Started on the first request when the startup hook did not run
+        self._start_workers()
+        self._queue.put_nowait(JoinDecision(bot, chat_id, user_id, approve))
+        JOIN_REQUEST_QUEUE_DEPTH.inc()
+
+    @staticmethod
+    async def _answer(decision: JoinDecision) -> None:
+        if decision.approve:
+            await decision.bot.approve_chat_join_request(chat_id=decision.chat_id, user_id=decision.user_id)
+        else:
+            await decision.bot.decline_chat_join_request(chat_id=decision.chat_id, user_id=decision.user_id)
+
+    async def _work(self) -> None:
+        while True:
+            decision = await self._queue.get()
+            try:
+                await self._answer(decision)
+            except TelegramAPIError:
+                # Mostly requests already answered by an admin or cancelled by the user
+                logger.exception('Failed to answer join request of %s to %s', decision.user_id, decision.chat_id)
+            except Exception:
+                # The worker keeps running, a dead one would leave its requests in the queue forever
+                logger.exception('Unexpected error answering join request of %s to %s',
+                                 decision.user_id, decision.chat_id)
+            finally:
+                self._queue.task_done()
+                JOIN_REQUEST_QUEUE_DEPTH.dec()
+
+    def _start_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def start(self) -> None:
+        self._start_workers()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted request is answered, False if the timeout ran out first."""
+        if self._queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stop(self, timeout: float = JOIN_REQUEST_DRAIN_TIMEOUT) -> None:
+        if self._queue is None:
+            return
+        if not await self.drain(timeout):
+            logger.warning('Join requests left unanswered on shutdown: %s', self._queue.qsize())
+            JOIN_REQUEST_QUEUE_DEPTH.dec(self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+        self._tasks = []
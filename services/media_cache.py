@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import logging
+
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from services.singleton import SingletonMeta
+from database.connector import DbConnector
+
+logger = logging.getLogger(__name__)
+
+
+def media_source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def is_remote_media(source: str) -> bool:
+    return source.startswith(('http://', 'https://'))
+
+
+# Descriptions of the errors meaning the stored file_id itself is unusable
+STALE_FILE_ID_ERRORS = ('wrong file identifier', 'wrong remote file', 'file reference expired')
+
+
+def is_stale_file_id(error: TelegramBadRequest) -> bool:
+    description = error.message.lower()
+    return any(message in description for message in STALE_FILE_ID_ERRORS)
+
+
+class MediaCache(metaclass=SingletonMeta):
+    """
+        Remembers the file_id Telegram assigns to a photo sent by URL, so the
+        photo is uploaded once and every later send reuses the stored file.
+        The file_ids are kept in the media_files table and in memory.
+    """
+
+    def __init__(self):
+        self._file_ids: Dict[str, str] = {}
+        self._uploading: Dict[str, asyncio.Future] = {}
+
+    async def _get_file_id(self, source_hash: str) -> Optional[str]:
+        file_id = self._file_ids.get(source_hash)
+        if file_id is None:
+            file_id = await DbConnector().get_media_file_id(source_hash)
+            if file_id is not None:
+                self._file_ids[source_hash] = file_id
+        return file_id
+
+    async def _forget(self, source_hash: str) -> None:
+        self._file_ids.pop(source_hash, None)
+        await DbConnector().delete_media_file_id(source_hash)
+
+    async def _upload(self, bot: Bot, source_hash: str, chat_id: int, photo: str, **kwargs: Any) -> Message:
+        uploading = self._uploading.get(source_hash)
+        if uploading is not None:
+            # Another send is uploading the same photo, reuse its file_id once it is known
+            file_id = await asyncio.shield(uploading)
+            if file_id is not None:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            return await bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+
+        file_id = self._file_ids.get(source_hash)
+        if file_id is not None:
+            # Uploaded while this send was looking the file_id up in the database
+            return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+
+        uploading = asyncio.get_running_loop().create_future()
+        self._uploading[source_hash] = uploading
+        file_id = None
+        try:
+            message = await bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+            file_id = message.photo[-1].file_id
+            self._file_ids[source_hash] = file_id
+        finally:
+            uploading.set_result(file_id)
+            del self._uploading[source_hash]
+        try:
+            await DbConnector().save_media_file_id(source_hash, photo, file_id)
+        except Exception:
+            logger.exception('Failed to save file_id of %s', photo)
+        return message
+
+    async def send_photo(self, bot: Bot, chat_id: int, photo: str, **kwargs: Any) -> Message:
+        """Bot.send_photo that uploads a photo given by URL only the first time it is sent."""
+        if not is_remote_media(photo):
+            return await bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+
+        source_hash = media_source_hash(photo)
+        file_id = await self._get_file_id(source_hash)
+        if file_id is not None:
+            try:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # Other bad requests (chat not found, caption too long, ...) fail the upload all the same
+                if not is_stale_file_id(e):
+                    raise
+                logger.warning('Cached file_id of %s is rejected, uploading it again', photo)
+                await self._forget(source_hash)
+        return await self._upload(bot, source_hash, chat_id, photo, **kwargs)
@@ -0,0 +1,104 @@
+import collections
+import os
+import time
+
+from contextvars import ContextVar
+from typing import Any, Callable, Optional, Tuple
+
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST,
+                               generate_latest, multiprocess, start_http_server)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from configuration import METRICS_HOST, METRICS_PORT
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+HANDLER_LATENCY = Histogram('bot_handler_seconds', 'Time to process an event, by handler',
+                            ['event_type', 'handler'], buckets=LATENCY_BUCKETS)
+HANDLER_DB_QUERIES = Histogram('bot_handler_db_queries', 'Database queries per event, by handler',
+                               ['event_type', 'handler'], buckets=QUERY_COUNT_BUCKETS)
+HANDLER_DB_TIME = Histogram('bot_handler_db_seconds', 'Database time per event, by handler',
+                            ['event_type', 'handler'], buckets=LATENCY_BUCKETS)
+DB_QUERIES = Counter('db_queries_total', 'Database queries executed')
+DB_QUERY_LATENCY = Histogram('db_query_seconds', 'Database query latency', buckets=LATENCY_BUCKETS)
+BOT_API_LATENCY = Histogram('bot_api_request_seconds', 'Bot API call latency, by method',
+                            ['method'], buckets=LATENCY_BUCKETS)
+FSM_STORAGE_LATENCY = Histogram('bot_fsm_storage_seconds', 'FSM storage latency, by operation',
+                                ['operation'], buckets=LATENCY_BUCKETS)
+OUTBOUND_QUEUE_DEPTH = Gauge('bot_outbound_queue_depth', 'Bot API calls waiting for the rate limiter',
+                             multiprocess_mode='livesum')
+JOIN_REQUEST_QUEUE_DEPTH = Gauge('bot_join_request_queue_depth', 'Chat join requests waiting for an answer',
+                                 multiprocess_mode='livesum')
+
+
+class UpdateStats:
+    """
+        Measurements collected while one event or Flask request is handled.
+        The query profiler also counts the executions of every statement.
+    """
+
+    __slots__ = ('handler', 'queries', 'query_time', 'statements')
+
+    def __init__(self, count_statements: bool = False):
+        self.handler = 'unhandled'
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements: Optional[collections.Counter] = collections.Counter() if count_statements else None
+
+
+current_stats: ContextVar[Optional[UpdateStats]] = ContextVar('update_stats', default=None)
+
+# Called with (conn, statement, parameters, executemany, elapsed) for queries slower than the threshold
+SlowQueryHandler = Callable[[Any, str, Any, bool, float], None]
+_slow_query_handler: Optional[SlowQueryHandler] = None
+_slow_query_threshold = float('inf')
+
+
+def on_slow_query(threshold: float, handler: SlowQueryHandler) -> None:
+    global _slow_query_handler, _slow_query_threshold
+    _slow_query_threshold, _slow_query_handler = threshold, handler
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info['query_started_at'].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+        if stats.statements is not None:
+            stats.statements[statement] += 1
+    if elapsed >= _slow_query_threshold:
+        _slow_query_handler(conn, statement, parameters, executemany, elapsed)
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def metrics_registry() -> CollectorRegistry:
+    # Sharded workers write their samples to PROMETHEUS_MULTIPROC_DIR, which is aggregated on scrape
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format and their content type."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server() -> None:
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, addr=METRICS_HOST, registry=metrics_registry())
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+
+from typing import List, NamedTuple, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest,
+                                TelegramNetworkError)
+from aiogram.types import Message, InlineKeyboardMarkup
+
+from services.singleton import SingletonMeta
+from services.rate_limiter import TokenBucket
+
+from bot.utils.strings import strings
+
+from configuration import NOTIFICATION_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 3
+
+
+class Notification(NamedTuple):
+    chat_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    parse_mode: Optional[str] = None
+
+
+async def deliver(bot: Bot, bucket: Optional[TokenBucket], notification: Notification,
+                  attempts: int = NOTIFICATION_MAX_ATTEMPTS) -> bool:
+    """
+        Send one notification within the bucket rate, waiting out flood control. Returns False if undeliverable.
+        Without a bucket the rate is left to OutboundRateLimitMiddleware of the bot.
+    """
+    for _ in range(attempts):
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            await bot.send_message(
+                chat_id=notification.chat_id,
+                text=notification.text,
+                reply_markup=notification.reply_markup,
+                parse_mode=notification.parse_mode
+            )
+            return True
+        except TelegramRetryAfter as e:
+            # Flood control applies to the whole bot, so every sender waits
+            if bucket is not None:
+                bucket.pause(e.retry_after)
+            else:
+                await asyncio.sleep(e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest):
+            return False
+        except TelegramNetworkError:
+            await asyncio.sleep(1)
+    return False
+
+
+class NotificationQueue(metaclass=SingletonMeta):
+    """
+        Sends notifications produced by bulk admin commands in the background
+        and keeps the admin's progress message up to date.
+        The sends are paced by OutboundRateLimitMiddleware of the bot alone,
+        so notifications share the bot-wide limit with the handlers.
+    """
+
+    def __init__(self):
+        self._jobs: Set[asyncio.Task] = set()
+
+    def submit(self, bot: Bot, notifications: List[Notification], progress_message: Message) -> None:
+        job = asyncio.create_task(self._deliver_all(bot, notifications, progress_message))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
+    async def _deliver_all(self, bot: Bot, notifications: List[Notification], progress_message: Message) -> None:
+        total = len(notifications)
+        sent = failed = 0
+        reported_at = time.monotonic()
+        for result in asyncio.as_completed([deliver(bot, None, notification)
+                                            for notification in notifications]):
+            if await result:
+                sent += 1
+            else:
+                failed += 1
+            if time.monotonic() - reported_at > PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                await self._report(progress_message, strings.get('event_admin_prompts', 'notifications_progress')
+                                   .format(sent=sent + failed, total=total))
+        await self._report(progress_message, strings.get('event_admin_prompts', 'notifications_finished')
+                           .format(sent=sent, total=total, failed=failed))
+
+    @staticmethod
+    async def _report(progress_message: Message, text: str) -> None:
+        try:
+            await progress_message.edit_text(text=text)
+        except TelegramBadRequest:
+            logger.exception('Failed to update notification progress')
+
+    async def stop(self) -> None:
+        if self._jobs:
+            await asyncio.gather(*self._jobs, return_exceptions=True)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, EVENTS_TOPIC
+from database.base import async_session
+from database.models.events import Event
+
+from bot.utils.keyboards import EventKeyboards
+from bot.utils.strings import current_locale
+from bot.utils.utils import generate_event_text
+
+from configuration import EVENTS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class OpenEvent(NamedTuple):
+    id: int
+    title: str
+    caption: str
+    photo: Optional[str]
+    max_capacity: Optional[int]
+    first_division_invite_link: Optional[str]
+    second_division_invite_link: Optional[str]
+    first_division_chat_id: Optional[int]
+    second_division_chat_id: Optional[int]
+
+
+class OpenEvents:
+    """
+        Immutable snapshot of the events open for registration, in id order,
+        with their captions rendered in advance and the list keyboard built
+        once per locale, returned to every caller as its own copy.
+    """
+
+    def __init__(self, version: int, events: Iterable[OpenEvent]):
+        self.version = version
+        self._events: Dict[int, OpenEvent] = {event.id: event for event in events}
+        self._keyboards: Dict[str, InlineKeyboardMarkup] = {}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def get(self, event_id: int) -> Optional[OpenEvent]:
+        return self._events.get(event_id)
+
+    def keyboard(self) -> InlineKeyboardMarkup:
+        locale = current_locale.get()
+        keyboard = self._keyboards.get(locale)
+        if keyboard is None:
+            keyboard = self._keyboards[locale] = EventKeyboards.generate_event_list(
+                [[event.id, event.title] for event in self._events.values()]
+            )
+        return keyboard.model_copy(deep=True)
+
+
+class OpenEventsCache(metaclass=SingletonMeta):
+    """
+        Holds the current OpenEvents snapshot. Every invalidation bumps the
+        version, and a snapshot loaded while a newer invalidation arrived is
+        served only until the next read reloads it.
+    """
+
+    def __init__(self, ttl: int = EVENTS_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._events: Optional[OpenEvents] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def reload(self) -> None:
+        version = self.version
+        async with async_session() as s:
+            events = (await s.scalars(
+                select(Event).where(Event.is_registration_enabled == True).order_by(Event.id)
+            )).all()
+        snapshot: Tuple[OpenEvent, ...] = tuple([
+            OpenEvent(
+                id=event.id,
+                title=event.title,
+                caption=await generate_event_text(event.title, event.description),
+                photo=event.photo,
+                max_capacity=event.max_capacity,
+                first_division_invite_link=event.first_division_invite_link,
+                second_division_invite_link=event.second_division_invite_link,
+                first_division_chat_id=event.first_division_chat_id,
+                second_division_chat_id=event.second_division_chat_id
+            )
+            for event in events
+        ])
+        self._events = OpenEvents(version, snapshot)
+        if version == self.version:
+            self._expires_at = time.monotonic() + self.ttl
+        logger.info('Open events reloaded: %s events, version %s', len(snapshot), version)
+
+    async def invalidate(self) -> None:
+        self.version += 1
+        self._expires_at = 0.0
+
+    async def get_events(self) -> OpenEvents:
+        if self._events is None or self._expires_at < time.monotonic():
+            async with self._lock:
+                if self._events is None or self._expires_at < time.monotonic():
+                    await self.reload()
+        return self._events
+
+    async def get(self, event_id: int) -> Optional[OpenEvent]:
+        return (await self.get_events()).get(event_id)
+
+    async def start(self) -> None:
+        InvalidationListener().subscribe(EVENTS_TOPIC, self.invalidate)
+        await self.reload()
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from typing import Optional
+
+
+class TokenBucket:
+    """
+        Asyncio token bucket: allows `rate` acquisitions per second with bursts
+        of up to `capacity`. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.waiting = 0
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        """Hold every acquisition for `seconds`, e.g. after Telegram answered with retry_after."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+
+# Reserves the next free slot of the limit and returns how long the caller waits for it, in ms.
+# Redis' own clock is used, so processes on different hosts agree on the schedule.
+_RESERVE_SCRIPT = """
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+local interval = tonumber(ARGV[1])
+local next_free = tonumber(redis.call('GET', KEYS[1]) or '0')
+if next_free < now then next_free = now end
+local wait = next_free - now - (tonumber(ARGV[2]) - 1) * interval
+if wait < 0 then wait = 0 end
+next_free = next_free + interval
+redis.call('SET', KEYS[1], string.format('%.3f', next_free), 'PX', math.ceil(next_free - now) + 1000)
+return math.floor(wait)
+"""
+
+_PAUSE_SCRIPT = """
+local time = redis.call('TIME')
+local now = time[1] * 1000 + math.floor(time[2] / 1000)
+-- The burst allowance is added, so no reservation is granted before the pause ends
+local paused_until = now + tonumber(ARGV[1]) + (tonumber(ARGV[3]) - 1) * tonumber(ARGV[2])
+if tonumber(redis.call('GET', KEYS[1]) or '0') < paused_until then
+    redis.call('SET', KEYS[1], string.format('%.3f', paused_until), 'PX', math.ceil(paused_until - now) + 1000)
+end
+"""
+
+
+class SharedTokenBucket:
+    """
+        TokenBucket counterpart whose schedule lives in Redis, so every process
+        sending through the same bot (bot workers, webhook replicas, broadcast
+        workers) shares one limit. Each acquisition takes one round trip.
+    """
+
+    def __init__(self, redis, key: str, rate: float, capacity: Optional[float] = None):
+        self.redis = redis
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.waiting = 0
+        self._paused_until = 0.0
+        self._reserve = redis.register_script(_RESERVE_SCRIPT)
+        self._pause = redis.register_script(_PAUSE_SCRIPT)
+        self._pauses = set()
+
+    def pause(self, seconds: float) -> None:
+        """Hold acquisitions of this process at once and of the other processes with the next reservation."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        task = asyncio.ensure_future(self._pause(keys=[self.key], args=[seconds * 1000, 1000 / self.rate, self.capacity]))
+        self._pauses.add(task)
+        task.add_done_callback(self._pauses.discard)
+
+    async def acquire(self) -> None:
+        self.waiting += 1
+        try:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+            wait = await self._reserve(keys=[self.key], args=[1000 / self.rate, self.capacity])
+            if wait:
+                await asyncio.sleep(int(wait) / 1000)
+        finally:
+            self.waiting -= 1
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import multiprocessing
+
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+def update_shard_key(update: Update) -> int:
+    """Updates of one user share a key, so they are always handled by the same worker."""
+    chat, user, _ = UserContextMiddleware.resolve_event_context(event=update)
+    if user is not None:
+        return user.id
+    if chat is not None:
+        return chat.id
+    return update.update_id
+
+
+class KeyedSerialExecutor:
+    """
+        Runs jobs with the same key one after another in submission order,
+        while jobs with different keys run concurrently.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Deque[Callable[[], Awaitable[None]]]] = {}
+        self._drains: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def submit(self, key: int, job: Callable[[], Awaitable[None]]) -> None:
+        jobs = self._pending.get(key)
+        if jobs is not None:
+            jobs.append(job)
+            return
+        self._pending[key] = deque([job])
+        drain = asyncio.create_task(self._drain(key))
+        self._drains.append(drain)
+        drain.add_done_callback(self._drains.remove)
+
+    async def _drain(self, key: int) -> None:
+        jobs = self._pending[key]
+        try:
+            while jobs:
+                job = jobs.popleft()
+                try:
+                    await job()
+                except Exception:
+                    logger.exception('Failed to process update for %s', key)
+        finally:
+            del self._pending[key]
+
+    async def join(self) -> None:
+        while self._drains:
+            await asyncio.gather(*self._drains, return_exceptions=True)
+
+
+class UpdateSharder:
+    """
+        Fans updates out to worker processes partitioned by the user who sent them.
+        `worker_target` is started in every process with its update queue and
+        has to pass it to `consume_shard`.
+    """
+
+    def __init__(self, workers: int, worker_target: Callable[[multiprocessing.Queue], None]):
+        context = multiprocessing.get_context('spawn')
+        self._queues = [context.Queue() for _ in range(workers)]
+        self._processes = [
+            context.Process(target=worker_target, args=(queue,), name=f'bot-worker-{index}', daemon=True)
+            for index, queue in enumerate(self._queues)
+        ]
+
+    def start(self) -> None:
+        for process in self._processes:
+            process.start()
+        logger.info('Started %s bot workers', len(self._processes))
+
+    def submit(self, update: Update, raw_update: Optional[str] = None) -> None:
+        if raw_update is None:
+            raw_update = update.model_dump_json(exclude_unset=True, by_alias=True)
+        queue = self._queues[update_shard_key(update) % len(self._queues)]
+        queue.put_nowait(raw_update)
+
+    def stop(self) -> None:
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join()
+
+
+async def consume_shard(dispatcher: Dispatcher, bot: Bot, queue: multiprocessing.Queue) -> None:
+    """Feeds updates from the sharder queue to the dispatcher until the sharder stops."""
+    loop = asyncio.get_running_loop()
+    executor = KeyedSerialExecutor()
+    await dispatcher.emit_startup(bot=bot, bots=[bot], dispatcher=dispatcher)
+    try:
+        while True:
+            raw_update = await loop.run_in_executor(None, queue.get)
+            if raw_update is None:
+                break
+            update = Update.model_validate_json(raw_update, context={'bot': bot})
+            executor.submit(
+                update_shard_key(update),
+                lambda update=update: dispatcher.feed_update(bot, update)
+            )
+        await executor.join()
+    finally:
+        await dispatcher.emit_shutdown(bot=bot, bots=[bot], dispatcher=dispatcher)
+        await bot.session.close()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from services.singleton import SingletonMeta
+from services.cache_invalidation import InvalidationListener, USERS_TOPIC
+from database.connector import DbConnector
+from database.models.user import User
+
+from configuration import USER_CACHE_SIZE, USER_CACHE_TTL, USER_CACHE_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache(metaclass=SingletonMeta):
+    """
+        Bounded TTL/LRU cache of User snapshots keyed by telegram_id.
+
+        Concurrent misses for the same user share one database lookup, and
+        username changes are collected and written to the database in batches.
+        Users changed elsewhere (admin panel, other bot processes) are dropped
+        on users invalidations.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: int = USER_CACHE_TTL,
+                 flush_interval: int = USER_CACHE_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._users: 'OrderedDict[int, Tuple[float, User]]' = OrderedDict()
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._dirty_usernames: Dict[int, Optional[str]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def get_cached(self, telegram_id: int) -> Optional[User]:
+        entry = self._users.get(telegram_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._users[telegram_id]
+            return None
+        self._users.move_to_end(telegram_id)
+        return user
+
+    async def get(self, telegram_id: int, username: Optional[str] = None) -> User:
+        user = self.get_cached(telegram_id)
+        if user is not None:
+            return user
+
+        loading = self._loading.get(telegram_id)
+        if loading is not None:
+            user = await asyncio.shield(loading)
+            if user is not None:
+                return user
+            # The loading update was cancelled, load the user for this one
+            return await self.get(telegram_id, username)
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[telegram_id] = loading
+        try:
+            user = await DbConnector().upsert_user(telegram_id, username)
+        except Exception as e:
+            loading.set_exception(e)
+            # Mark the exception as retrieved for the case nobody else was waiting
+            loading.exception()
+            raise
+        except BaseException:
+            # Cancelled: waiters get None and load the user themselves
+            loading.set_result(None)
+            raise
+        else:
+            self.put(user)
+            loading.set_result(user)
+        finally:
+            del self._loading[telegram_id]
+        return user
+
+    def put(self, user: User) -> None:
+        self._users[user.telegram_id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user.telegram_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    async def invalidate(self, telegram_id: Optional[str] = None) -> None:
+        """Drop the user with `telegram_id`, every user without it."""
+        if telegram_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(int(telegram_id), None)
+
+    def update_username(self, user: User, username: Optional[str]) -> None:
+        user.username = username
+        self._dirty_usernames[user.telegram_id] = username
+
+    async def flush(self) -> None:
+        if not self._dirty_usernames:
+            return
+        usernames, self._dirty_usernames = self._dirty_usernames, {}
+        try:
+            await DbConnector().update_usernames(usernames)
+        except Exception:
+            logger.exception('Failed to flush %s username updates', len(usernames))
+            # Keep newer changes that arrived while flushing
+            usernames.update(self._dirty_usernames)
+            self._dirty_usernames = usernames
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._flusher is None:
+            InvalidationListener().subscribe(USERS_TOPIC, self.invalidate)
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()